@@ -0,0 +1 @@
+# Shared code for the AquaEarth forecast servers (backend/app.py and api/index.py)
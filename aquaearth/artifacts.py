@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+from .inference import NUMERIC_FEATURES, InferenceEngine
+from .trees import BACKENDS, INFERENCE_BACKEND, TreeEnsemble, save_trees
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model.ubj"
+META_FILE = "model_meta.json"
+TREES_FILE = "model_trees.npz"
+ARTIFACT_FORMAT = 1
+
+# A versioned model directory holds one artifact directory per version
+# plus a CURRENT file naming the version to serve
+CURRENT_FILE = "CURRENT"
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 5))
+MODEL_KEEP_VERSIONS = int(os.environ.get("MODEL_KEEP_VERSIONS", 5))
+
+
+def artifact_paths(model_dir, backend="xgboost"):
+    model_file = TREES_FILE if backend == "numpy" else MODEL_FILE
+    return os.path.join(model_dir, model_file), os.path.join(model_dir, META_FILE)
+
+
+def current_version(model_dir):
+    """The version named in ``model_dir``/CURRENT; None for a flat artifact dir."""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_artifact(model_dir):
+    """(version, directory holding the artifact files) for a flat or versioned dir."""
+    version = current_version(model_dir)
+    if version is None:
+        return None, model_dir
+    return version, os.path.join(model_dir, version)
+
+
+def file_digest(*paths):
+    """Short SHA-256 of the files' contents."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def check_artifact(model_dir, backend=INFERENCE_BACKEND):
+    """Fail loudly (at import time) if the serving artifact is incomplete."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND {backend!r}, expected one of {BACKENDS}")
+    _, artifact_dir = resolve_artifact(model_dir)
+    missing = [p for p in artifact_paths(artifact_dir, backend) if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(
+            f"Model artifact missing: {', '.join(missing)}. "
+            "Run backend/export_model.py to produce it."
+        )
+
+
+def save_artifact(booster, categories, labels, model_dir, version=None):
+    """Write the booster as UBJSON, its flattened trees for the NumPy
+    backend, and a small JSON metadata sidecar."""
+    os.makedirs(model_dir, exist_ok=True)
+    model_path, meta_path = artifact_paths(model_dir)
+    booster.save_model(model_path)
+    save_trees(booster, os.path.join(model_dir, TREES_FILE))
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "categories": [str(c) for c in categories],
+        "labels": [str(l) for l in labels],
+        "numeric_features": NUMERIC_FEATURES,
+        "num_features": booster.num_features(),
+        "num_boosted_rounds": booster.num_boosted_rounds(),
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return model_path, meta_path
+
+
+def publish_artifact(booster, categories, labels, model_dir, keep=MODEL_KEEP_VERSIONS):
+    """Add a version to a versioned model directory and make it current.
+
+    The artifact is written to a hidden directory and renamed into place,
+    then CURRENT is replaced atomically, so a watching server never sees a
+    partly written model. Only the newest ``keep`` versions are kept.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_dir = os.path.join(model_dir, f".tmp-{version}")
+    save_artifact(booster, categories, labels, tmp_dir, version=version)
+    os.rename(tmp_dir, os.path.join(model_dir, version))
+
+    tmp_current = os.path.join(model_dir, f".{CURRENT_FILE}.tmp")
+    with open(tmp_current, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_current, os.path.join(model_dir, CURRENT_FILE))
+
+    # Version names are UTC timestamps, so they sort oldest first
+    versions = sorted(d for d in os.listdir(model_dir)
+                      if not d.startswith(".") and os.path.isdir(os.path.join(model_dir, d)))
+    for old in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(model_dir, old), ignore_errors=True)
+    return version
+
+
+def load_artifact(model_dir, localities, backend=INFERENCE_BACKEND):
+    """Load the artifact into an InferenceEngine.
+
+    The xgboost backend imports xgboost on first use; the NumPy backend
+    only reads the flattened trees and never imports it.
+    """
+    model_path, meta_path = artifact_paths(model_dir, backend)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("format") != ARTIFACT_FORMAT or meta["numeric_features"] != NUMERIC_FEATURES:
+        raise ValueError(f"Incompatible model artifact metadata in {meta_path}")
+    if backend == "numpy":
+        booster = TreeEnsemble.load(model_path)
+    else:
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(model_path)
+    return InferenceEngine(booster, meta["categories"], meta["labels"], localities,
+                           fingerprint=file_digest(model_path, meta_path))
+
+
+class LazyEngine:
+    """Loads the engine once, on first use or in a background warm-up thread,
+    and hot-swaps it when a versioned model directory gets a new version.
+
+    Starting the warm-up at import lets the xgboost import and model load
+    overlap with the first request's validation and weather fetch.
+
+    ``reload()`` loads a newly published version alongside the serving one
+    and replaces it with a single assignment; requests already holding the
+    old engine finish with it. ``start()`` polls CURRENT every ``interval``
+    seconds.
+    """
+
+    def __init__(self, model_dir, localities, backend=INFERENCE_BACKEND, interval=MODEL_WATCH_INTERVAL):
+        self.model_dir = model_dir
+        self.localities = localities
+        self.backend = backend
+        self.interval = interval
+        # Engine and its version info are swapped together, never one without the other
+        self._active = (None, None)
+        self.reloads = 0
+        self.reload_failures = 0
+        self.last_error = None
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._task = None
+
+    @property
+    def engine(self):
+        return self._active[0]
+
+    @property
+    def info(self):
+        return self._active[1]
+
+    @property
+    def load_ms(self):
+        info = self._active[1]
+        return info["load_ms"] if info is not None else None
+
+    def _load(self):
+        version, artifact_dir = resolve_artifact(self.model_dir)
+        t0 = time.perf_counter()
+        engine = load_artifact(artifact_dir, self.localities, self.backend)
+        info = {
+            "version": version or "unversioned",
+            "path": artifact_dir,
+            "fingerprint": engine.fingerprint,
+            "loaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "load_ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+        self._active = (engine, info)
+        logger.info(f"✅ Model {info['version']} loaded from {artifact_dir} ({self.backend} backend) in {info['load_ms']} ms")
+        return engine
+
+    def get(self):
+        engine = self._active[0]
+        if engine is None:
+            with self._lock:
+                engine = self._active[0]
+                if engine is None:
+                    engine = self._load()
+        return engine
+
+    async def aget(self):
+        engine = self._active[0]
+        if engine is not None:
+            return engine
+        return await asyncio.to_thread(self.get)
+
+    def warm_up(self):
+        def run():
+            try:
+                self.get()
+            except Exception:
+                logger.exception("Model warm-up failed")
+        thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        thread.start()
+        if hasattr(os, "register_at_fork"):
+            # A worker forked mid-load would inherit a held lock and no engine
+            os.register_at_fork(before=thread.join)
+
+    def reload(self):
+        """Swap in the published version if it differs from the serving one.
+
+        Returns True when a new model was swapped in. A version that fails
+        to load is logged once and the serving model is kept.
+        """
+        version = current_version(self.model_dir)
+        if version is None or version == self._failed_version:
+            return False
+        with self._lock:
+            info = self._active[1]
+            if info is not None and info["version"] == version:
+                return False
+            try:
+                self._load()
+            except Exception as e:
+                self.reload_failures += 1
+                self.last_error = repr(e)
+                self._failed_version = version
+                logger.exception(f"Loading model version {version} failed, keeping the serving model")
+                return False
+        self.reloads += 1
+        self.last_error = None
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("Model watch failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        info = self._active[1] or {}
+        return {
+            "version": info.get("version"),
+            "loaded_at": info.get("loaded_at"),
+            "load_ms": info.get("load_ms"),
+            "path": info.get("path"),
+            "fingerprint": info.get("fingerprint"),
+            "backend": self.backend,
+            "published_version": current_version(self.model_dir),
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+            "last_error": self.last_error,
+            "watching": self._task is not None and not self._task.done(),
+        }
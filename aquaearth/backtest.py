@@ -0,0 +1,65 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .encoding import Table
+from .features import WINDOW_DAYS, rolling_weather_features
+from .inference import HOUSEHOLD_FIELDS, WEATHER_FEATURES
+from .metrics import timed
+from .weather import fetch_archive_daily
+
+BACKTEST_MAX_DAYS = int(os.environ.get("BACKTEST_MAX_DAYS", 3660))
+
+
+def check_range(start, end):
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    n_days = (end - start).days + 1
+    if n_days > BACKTEST_MAX_DAYS:
+        raise ValueError(f"Range too long: {n_days} days (max {BACKTEST_MAX_DAYS})")
+    if end.date() >= datetime.now().date():
+        raise ValueError("end_date must be in the past")
+    return n_days
+
+
+async def backtest(engine, place, household, start, end):
+    """Score ``household`` at ``place`` for every day in [start, end].
+
+    The archive is read once for the whole range plus the 29-day lead-in,
+    every day's 30-day window features come from one vectorized pass and
+    all days are scored in a single booster call. Each day's result equals
+    the /predict_week response for that date.
+
+    Returns a Table with one row per day; raises ValueError for an
+    invalid range before fetching anything.
+    """
+    n_days = check_range(start, end)
+    with timed("weather"):
+        daily = await fetch_archive_daily(place.lat, place.lon, start - timedelta(days=WINDOW_DAYS - 1), end)
+    dates, weather, proba = await asyncio.to_thread(_score_days, engine, place, household, start, n_days, daily)
+    labels = engine.labels
+    return Table({
+        "week_prediction": np.asarray(labels)[proba.argmax(axis=1)].tolist(),
+        "probabilities": {label: proba[:, k].tolist() for k, label in enumerate(labels)},
+        "forecast_range": {
+            "start": [str(dt.date()) for dt in dates],
+            "end": [str((dt + timedelta(days=6)).date()) for dt in dates],
+        },
+        "weather_data": {f: weather[f] for f in WEATHER_FEATURES},
+    })
+
+
+def _score_days(engine, place, household, start, n_days, daily):
+    weather = rolling_weather_features(
+        daily["precipitation_sum"], daily["temperature_2m_mean"], daily["temperature_2m_max"],
+        np.arange(WINDOW_DAYS - 1, WINDOW_DAYS - 1 + n_days),
+    )
+    dates = [start + timedelta(days=i) for i in range(n_days)]
+    X = engine.build(
+        engine.locality_index[place.locality], {f: household[f] for f in HOUSEHOLD_FIELDS}, weather, dates,
+        locality_features=place.feature_override,
+    )
+    return dates, weather, engine.predict_proba(X)
+
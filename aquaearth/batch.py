@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+
+import numpy as np
+
+from .encoding import Table
+from .inference import HOUSEHOLD_FIELDS, LOCALITY_FEATURES, WEATHER_FEATURES
+from .weather import fetch_last30_days_weather
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_BATCH_MAX", 5000))
+
+
+async def predict_batch(engine, reqs, locations, parse_date):
+    """Score many /predict_week requests with one weather fetch per
+    (weather grid cell, date) group and a single booster call.
+
+    Returns a Table with one row per request, in input order: the
+    /predict_week response for rows that could be scored, ``{"error": ...}``
+    otherwise.
+    """
+    errors = [None] * len(reqs)
+    places = {}  # row position -> Location
+    keys = {}  # row position -> (weather cell, date)
+    groups = {}  # (weather cell, date) -> row positions
+    for pos, req in enumerate(reqs):
+        try:
+            place = locations.resolve(req.locality, req.lat, req.lon)
+        except ValueError as e:
+            errors[pos] = str(e)
+            continue
+        try:
+            dt = parse_date(req.prediction_date)
+        except ValueError:
+            errors[pos] = f"Invalid prediction_date: {req.prediction_date!r}"
+            continue
+        places[pos] = place
+        keys[pos] = ((place.lat, place.lon), dt)
+        groups.setdefault(keys[pos], []).append(pos)
+
+    # Fetch every group's window concurrently (bounded by the upstream client)
+    fetched = await asyncio.gather(
+        *(fetch_last30_days_weather(lat, lon, dt) for (lat, lon), dt in groups),
+        return_exceptions=True,
+    )
+    weather = {}
+    for key, w in zip(groups, fetched):
+        if isinstance(w, Exception):
+            (lat, lon), dt = key
+            logger.warning(f"Weather fetch failed for {lat},{lon} {dt.date()}: {w!r}")
+            for pos in groups[key]:
+                errors[pos] = "Weather data unavailable"
+        else:
+            weather[key] = w
+
+    # Rows that survived validation and weather lookup, in input order
+    rows = [pos for pos, key in keys.items() if key in weather]
+    places = [places[pos] for pos in rows]
+    keys = [keys[pos] for pos in rows]
+
+    # Feature building and scoring are CPU work; keep them off the event loop
+    return await asyncio.to_thread(_score_rows, engine, reqs, rows, places, keys, weather, errors)
+
+
+def _score_rows(engine, reqs, rows, places, keys, weather, errors):
+    n_reqs = len(reqs)
+    labels = engine.labels
+
+    def column(values):
+        # Cells of the scored rows at their input positions, None elsewhere
+        cells = [None] * n_reqs
+        for pos, value in zip(rows, values):
+            cells[pos] = value
+        return cells
+
+    if rows:
+        locality_features = None
+        if any(place.info is not None for place in places):
+            locality_features = {f: np.array([place.features[f] for place in places]) for f in LOCALITY_FEATURES}
+        X = engine.build(
+            np.array([engine.locality_index[place.locality] for place in places]),
+            {f: np.array([getattr(reqs[pos], f) for pos in rows]) for f in HOUSEHOLD_FIELDS},
+            {f: np.array([weather[key][f] for key in keys]) for f in WEATHER_FEATURES},
+            [dt for _, dt in keys],
+            locality_features=locality_features,
+        )
+        proba = engine.predict_proba(X)
+    else:
+        proba = np.empty((0, len(labels)))
+
+    dates = [dt for _, dt in keys]
+    return Table({
+        "week_prediction": column(np.asarray(labels)[proba.argmax(axis=1)].tolist()),
+        "probabilities": {label: column(proba[:, k].tolist()) for k, label in enumerate(labels)},
+        "forecast_range": {
+            "start": column(str(dt.date()) for dt in dates),
+            "end": column(str((dt + timedelta(days=6)).date()) for dt in dates),
+        },
+        "weather_data": {f: column(weather[key][f] for key in keys) for f in WEATHER_FEATURES},
+        "location": column(place.info for place in places),
+        "error": errors,
+    })
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import note_cache
+
+
+def retrieve_exception(future):
+    """Mark ``future``'s exception as retrieved once it fails, so a failure
+    whose every waiter was cancelled is not logged as never retrieved."""
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+
+class TTLCache:
+    """LRU cache with per-entry TTL and single-flight async loading.
+
+    Concurrent misses for the same key await one shared load task; the
+    waiters are counted as ``coalesced`` rather than ``misses``. The load is
+    shielded, so a cancelled caller does not cancel it for the others.
+    Loader errors are propagated to every waiter and never cached.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, name="cache"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> asyncio.Task
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for ``key``, awaiting ``loader()`` on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    note_cache(self.name, "hit")
+                    return entry[1]
+                del self._data[key]
+
+            task = self._inflight.get(key)
+            if task is not None:
+                self.coalesced += 1
+                note_cache(self.name, "coalesced")
+            else:
+                self.misses += 1
+                note_cache(self.name, "miss")
+                task = asyncio.ensure_future(self._load(key, loader, ttl))
+                retrieve_exception(task)
+                self._inflight[key] = task
+
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader, ttl):
+        try:
+            value = await loader()
+            with self._lock:
+                self._set(key, value, self.ttl if ttl is None else ttl)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def peek(self, key):
+        """Return a fresh cached value or None, without touching the counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            return None
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, self.ttl if ttl is None else ttl)
+
+    def _set(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "inflight": len(self._inflight),
+            }
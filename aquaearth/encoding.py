@@ -0,0 +1,127 @@
+import json
+import os
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Response formats a client can ask for in its Accept header
+ROWS = "application/json"  # a JSON array (or mapping) of row objects
+COLUMNS = "application/vnd.aquaearth.columns+json"  # one array per field
+NDJSON = "application/x-ndjson"  # one row object per line, streamed
+FORMATS = (ROWS, COLUMNS, NDJSON)
+# Rows serialized per chunk of an NDJSON stream
+NDJSON_CHUNK_ROWS = int(os.environ.get("NDJSON_CHUNK_ROWS", 1000))
+
+
+def dumps(obj):
+    """Compact JSON as bytes, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with ``dumps``.
+
+    Returned directly from an endpoint it also skips FastAPI's
+    ``jsonable_encoder`` pass, so content must already be plain JSON
+    types (or NumPy arrays).
+    """
+
+    def render(self, content):
+        with timed("serialize"):
+            return dumps(content)
+
+
+def negotiate(accept, offers=FORMATS):
+    """The offer the Accept header ranks highest; ties, a missing header
+    and no acceptable offer all go to the earliest offer."""
+    if not accept:
+        return offers[0]
+    # Per offer: (specificity, q) of the most specific media range matching it
+    ranks = {offer: (-1, 0.0) for offer in offers}
+    for part in accept.split(","):
+        media, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        for offer in offers:
+            if media == offer:
+                specificity = 2
+            elif media.endswith("/*") and offer.startswith(media[:-1]):
+                specificity = 1 if media != "*/*" else 0
+            else:
+                continue
+            if specificity > ranks[offer][0]:
+                ranks[offer] = (specificity, q)
+    best = max(offers, key=lambda offer: ranks[offer][1])
+    return best if ranks[best][1] > 0 else offers[0]
+
+
+class Table:
+    """A multi-row result kept as columns until the response format is known.
+
+    ``columns`` maps each field to a list with one cell per row, or to a
+    dict of such lists for a nested object (probabilities per label,
+    weather features). ``rows()`` rebuilds the row objects the endpoints
+    have always returned: None cells, and nested fields whose cells are
+    all None, are left out of a row.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        first = next(iter(columns.values()), [])
+        self.n_rows = len(next(iter(first.values()), [])) if isinstance(first, dict) else len(first)
+
+    def __len__(self):
+        return self.n_rows
+
+    def rows(self, start=0, stop=None):
+        columns = list(self.columns.items())
+        for i in range(start, self.n_rows if stop is None else min(stop, self.n_rows)):
+            row = {}
+            for field, cells in columns:
+                if isinstance(cells, dict):
+                    value = {key: sub[i] for key, sub in cells.items() if sub[i] is not None}
+                    if value:
+                        row[field] = value
+                elif cells[i] is not None:
+                    row[field] = cells[i]
+            yield row
+
+    def columnar(self):
+        return {"rows": self.n_rows, **self.columns}
+
+
+def _ndjson_chunks(table):
+    for start in range(0, len(table), NDJSON_CHUNK_ROWS):
+        yield b"".join(dumps(row) + b"\n" for row in table.rows(start, start + NDJSON_CHUNK_ROWS))
+
+
+def respond(request, table, rows_body=list, offers=FORMATS):
+    """``table`` in the format the request's Accept header picks from ``offers``.
+
+    ROWS is ``rows_body(table.rows())`` as JSON (a plain array by
+    default), COLUMNS is ``table.columnar()`` and NDJSON streams the rows
+    in chunks of NDJSON_CHUNK_ROWS, never holding the whole body.
+    """
+    media_type = negotiate(request.headers.get("accept") if request is not None else None, offers)
+    headers = {"Vary": "Accept"}
+    if media_type == NDJSON:
+        return StreamingResponse(_ndjson_chunks(table), media_type=NDJSON, headers=headers)
+    if media_type == COLUMNS:
+        return FastJSONResponse(table.columnar(), media_type=COLUMNS, headers=headers)
+    with timed("serialize"):
+        body = rows_body(table.rows())
+    return FastJSONResponse(body, headers=headers)
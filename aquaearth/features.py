@@ -0,0 +1,76 @@
+import numpy as np
+
+WINDOW_DAYS = 30
+HEATWAVE_TEMP_C = 35
+DRY_DAY_RAIN_MM = 1.0
+
+
+# Window statistics this close to a rounding boundary are recomputed from
+# the window's own values, far more than the running sums can drift
+ROUNDING_MARGIN = 1e-6
+
+
+def rolling_weather_features(rain, temp_mean, temp_max, end_idx):
+    """30-day window weather features for every window ending at ``end_idx``.
+
+    Every statistic comes from running sums over the whole series: a
+    window's rain sum, heatwave/dry day counts and the sums of temperature
+    and squared temperature (shifted by the series mean, so the variance
+    does not cancel) are differences of two running-sum entries. Each
+    window is O(1) after one pass over the series, however many windows
+    are asked for. A missing (NaN) day makes only the windows containing it
+    NaN, as reducing those windows would. Values are rounded as the
+    per-window code rounded them; the rare value within ROUNDING_MARGIN of
+    a rounding boundary is recomputed by reducing its window on its own,
+    so the results are bit-identical to slicing and reducing each window.
+    """
+    rain = np.asarray(rain, dtype=float)
+    temp_mean = np.asarray(temp_mean, dtype=float)
+    temp_max = np.asarray(temp_max, dtype=float)
+    end_idx = np.asarray(end_idx, dtype=np.intp)
+    start_idx = end_idx - (WINDOW_DAYS - 1)
+
+    def running(values):
+        return np.concatenate(([0], np.cumsum(values)))
+
+    def window_sum(values, start):
+        # Missing days add 0 to the running sum and are counted separately,
+        # so they cannot carry into the windows after them
+        missing = np.isnan(values)
+        sums = running(np.where(missing, 0.0, values))
+        gaps = running(missing)
+        return np.where(gaps[end_idx + 1] > gaps[start], np.nan, sums[end_idx + 1] - sums[start])
+
+    def window_count(mask, start):
+        counts = running(mask)
+        return counts[end_idx + 1] - counts[start]
+
+    known = temp_mean[~np.isnan(temp_mean)]
+    shift = known.mean() if known.size else 0.0
+    temp_sum = window_sum(temp_mean - shift, start_idx)
+    temp_sq_sum = window_sum((temp_mean - shift) ** 2, start_idx)
+    mean = temp_sum / WINDOW_DAYS
+    std = np.sqrt(np.maximum(temp_sq_sum / WINDOW_DAYS - mean * mean, 0.0))
+
+    def window(values, i, days=WINDOW_DAYS):
+        return values[end_idx[i] - days + 1:end_idx[i] + 1]
+
+    return {
+        "rainfall_30d_mm": _round1(window_sum(rain, start_idx), lambda i: window(rain, i).sum()),
+        "rainfall_last7d_mm": _round1(window_sum(rain, end_idx - 6), lambda i: window(rain, i, 7).sum()),
+        "temperature_avg_c": _round1(mean + shift, lambda i: window(temp_mean, i).mean()),
+        "temperature_std_c": _round1(std, lambda i: window(temp_mean, i).std()),
+        "heatwave_days_30d": window_count(temp_max > HEATWAVE_TEMP_C, start_idx).tolist(),
+        "dry_spell_days_30d": window_count(rain < DRY_DAY_RAIN_MM, start_idx).tolist()
+    }
+
+
+def _round1(values, exact):
+    """``round(v, 1)`` of every value, with ``exact(i)`` standing in for
+    values too close to a rounding boundary to round from a running sum."""
+    scaled = values * 10
+    near = np.abs(scaled - np.floor(scaled) - 0.5) < ROUNDING_MARGIN
+    rounded = [round(v, 1) for v in values.tolist()]
+    for i in np.flatnonzero(near).tolist():
+        rounded[i] = round(float(exact(i)), 1)
+    return rounded
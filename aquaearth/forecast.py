@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from functools import cached_property
+
+import numpy as np
+
+from .encoding import Table
+from .features import WINDOW_DAYS, rolling_weather_features
+from .inference import LOCALITY_FEATURES, WEATHER_FEATURES
+
+FORECAST_PAST_DAYS = 31
+# Horizon of /forecast_7day and /citywide_forecast
+FORECAST_DAYS = 7
+# Forecast days fetched per refresh, and so the longest horizon served;
+# Open-Meteo forecasts at most 16 days ahead
+FORECAST_MAX_DAYS = min(int(os.environ.get("FORECAST_MAX_DAYS", 16)), 16)
+
+
+def check_days(days):
+    if not 1 <= days <= FORECAST_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {FORECAST_MAX_DAYS}")
+    return days
+
+
+class ForecastBlock:
+    """The household-independent part of a locality's forecast: window
+    weather features, dates and the daily temp/rain shown per day, for
+    every forecast day in the series (``horizon`` days from today)."""
+
+    def __init__(self, daily, past_days=FORECAST_PAST_DAYS):
+        dates = daily["time"]
+        # Today is the date past_days after the series' first; checking it is
+        # where expected also catches a series with missing days
+        today = (date.fromisoformat(dates[0]) + timedelta(days=past_days)).isoformat()
+        if past_days < WINDOW_DAYS - 1 or len(dates) <= past_days or dates[past_days] != today:
+            raise ValueError(f"Forecast series from {dates[0]} has no full window ending {today}")
+        idx = np.arange(past_days, len(dates))
+        # All windows in one pass over the series, however long the horizon
+        self.weather = rolling_weather_features(
+            daily["precipitation_sum"], daily["temperature_2m_mean"], daily["temperature_2m_max"], idx
+        )
+        self.dates = [dates[i] for i in idx]
+        self.days = [datetime.strptime(d, "%Y-%m-%d") for d in self.dates]
+        self.day_names = [dt.strftime("%a") for dt in self.days]
+        self.temp = [round(float(daily["temperature_2m_mean"][i]), 1) for i in idx]
+        self.rain = [round(float(daily["precipitation_sum"][i]), 1) for i in idx]
+        self.horizon = len(idx)
+        self.fetched_at = time.time()
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+    @cached_property
+    def digest(self):
+        """Hash of the weather data, equal for equal data wherever it was fetched."""
+        data = json.dumps([self.dates, self.temp, self.rain, self.weather], sort_keys=True, default=float)
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+def score_blocks(engine, localities, household, blocks, profiles=None, locality_column=False, days=FORECAST_DAYS):
+    """Score one household profile against several localities' blocks.
+
+    All localities x ``days`` forecast days go through a single booster
+    call; the result is a Table of /forecast_7day day entries, the
+    localities' days one after the other, led by a "locality" column with
+    ``locality_column``. ``profiles``, one locality feature mapping per
+    block, overrides the localities' own (see Locations.resolve).
+    """
+    X_input = _block_rows(engine, localities, household, blocks, profiles, days)
+    return _day_table(engine, blocks, engine.predict_proba(X_input), days, localities if locality_column else None)
+
+
+async def score_blocks_batched(batcher, engine, localities, household, blocks, profiles=None, days=FORECAST_DAYS):
+    """score_blocks with the model call shared through a MicroBatcher."""
+    X_input = _block_rows(engine, localities, household, blocks, profiles, days)
+    return _day_table(engine, blocks, await batcher.predict_proba(engine, X_input), days)
+
+
+def by_locality(rows):
+    """Rows of a ``locality_column`` table as the /citywide_forecast
+    mapping of locality -> day entries."""
+    result = {}
+    for row in rows:
+        result.setdefault(row.pop("locality"), []).append(row)
+    return result
+
+
+def _block_rows(engine, localities, household, blocks, profiles, n_days):
+    short = min(b.horizon for b in blocks)
+    if n_days > short:
+        raise ValueError(f"Only {short} forecast days available")
+    loc_idx = np.repeat([engine.locality_index[name] for name in localities], n_days)
+    weather = {f: [v for b in blocks for v in b.weather[f][:n_days]] for f in WEATHER_FEATURES}
+    days = [dt for b in blocks for dt in b.days[:n_days]]
+    locality_features = None
+    if profiles is not None:
+        locality_features = {f: np.repeat([p[f] for p in profiles], n_days) for f in LOCALITY_FEATURES}
+
+    return engine.build(loc_idx, household, weather, days, locality_features=locality_features)
+
+
+def _day_table(engine, blocks, proba, n_days, localities=None):
+    pred_enc = proba.argmax(axis=1)
+    # Simple proxy for risk score; rint rounds half to even like round()
+    risk_score = np.rint(proba[np.arange(len(proba)), pred_enc].astype(np.float64) * 100).astype(int)
+
+    columns = {} if localities is None else {"locality": [name for name in localities for _ in range(n_days)]}
+    columns.update({
+        "date": [d for b in blocks for d in b.dates[:n_days]],
+        "day": [name for b in blocks for name in b.day_names[:n_days]],
+        "risk": np.asarray(engine.labels)[pred_enc].tolist(),
+        "score": risk_score.tolist(),
+        "temp": [v for b in blocks for v in b.temp[:n_days]],
+        "rain": [v for b in blocks for v in b.rain[:n_days]],
+    })
+    return Table(columns)
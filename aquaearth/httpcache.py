@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+
+from .store import ARCHIVE_FINAL_DAYS
+from .weather import WEATHER_ARCHIVE_FINAL_TTL, WEATHER_CACHE_TTL
+
+# Upper bound on how long browsers and the CDN may reuse a GET response; a
+# newly published model is only seen by shared caches once this runs out
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", 86400))
+
+
+def _canonical_value(value):
+    # 6.0 -> "6", as JavaScript's String(6.0) writes it
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def canonical_query(params):
+    """Query string of ``params`` in one fixed form: keys sorted, None
+    values left out, numbers written the shortest way."""
+    return urlencode(sorted((k, _canonical_value(v)) for k, v in params.items() if v is not None))
+
+
+def canonical_redirect(request, params):
+    """A 308 to the canonical URL for ``params``, or None if the request is
+    already there.
+
+    Equivalent queries (another key order, "6.0" for "6", unknown keys
+    such as cache busters) then share one URL, and so one CDN cache entry.
+    """
+    query = canonical_query(params)
+    if request.url.query == query:
+        return None
+    return RedirectResponse(f"{request.url.path}?{query}", status_code=308,
+                            headers={"Cache-Control": cache_control(HTTP_CACHE_MAX_AGE)})
+
+
+def make_etag(*parts):
+    """Strong ETag over JSON-serializable ``parts``."""
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(data.encode()).hexdigest()[:32] + '"'
+
+
+def not_modified(request, etag):
+    """Whether the request's If-None-Match already names ``etag``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match compares weakly (RFC 9110 13.1.2)
+    return etag in (t.strip().removeprefix("W/") for t in header.split(","))
+
+
+def cache_control(max_age):
+    max_age = max(0, min(int(max_age), HTTP_CACHE_MAX_AGE))
+    return f"public, max-age={max_age}, s-maxage={max_age}"
+
+
+def archive_max_age(end_date):
+    """Seconds a response built from the archive window ending on
+    ``end_date`` stays current: until the weather cache refreshes it, or
+    much longer once every day in it is final."""
+    end = end_date.date() if isinstance(end_date, datetime) else end_date
+    if end <= date.today() - timedelta(days=ARCHIVE_FINAL_DAYS):
+        return WEATHER_ARCHIVE_FINAL_TTL
+    return WEATHER_CACHE_TTL
+
+
+async def cached_response(request, etag, max_age, build, vary=None):
+    """304 if the client holds ``etag``, else ``await build()`` (a Response,
+    or content to send as JSON).
+
+    Both carry the ETag and Cache-Control, so the CDN and the browser can
+    reuse the response for ``max_age`` seconds and revalidate it after.
+    ``vary`` names the request headers the representation depends on;
+    ``etag`` must then cover them too.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control(max_age)}
+    if vary is not None:
+        headers["Vary"] = vary
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    content = await build()
+    if not isinstance(content, Response):
+        return JSONResponse(content, headers=headers)
+    content.headers.update(headers)
+    return content
@@ -0,0 +1,193 @@
+import os
+import threading
+import weakref
+
+import numpy as np
+
+from .metrics import timed
+
+# Native threads per booster call; 0 keeps xgboost's default of one per
+# core. Worker processes are sized explicitly (see aquaearth/serve.py)
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 0))
+
+# Column order the model was trained on: one-hot locality (categories order)
+# followed by these numeric features.
+NUMERIC_FEATURES = [
+    "household_size", "usage_per_person_lpd",
+    "rainfall_30d_mm", "rainfall_last7d_mm", "temperature_avg_c", "temperature_std_c",
+    "heatwave_days_30d", "dry_spell_days_30d",
+    "population_density_score", "construction_index", "tanker_cost_index",
+    "avg_demand_liters", "avg_supply_liters", "avg_supply_demand_ratio", "avg_supply_hours",
+    "tanker_trips_30d", "tanker_days_30d",
+    "day", "month", "weekday",
+]
+HOUSEHOLD_FIELDS = [
+    "household_size", "usage_per_person_lpd", "avg_demand_liters", "avg_supply_liters",
+    "avg_supply_hours", "tanker_trips_30d", "tanker_days_30d",
+]
+WEATHER_FEATURES = [
+    "rainfall_30d_mm", "rainfall_last7d_mm", "temperature_avg_c", "temperature_std_c",
+    "heatwave_days_30d", "dry_spell_days_30d",
+]
+LOCALITY_FEATURES = ["population_density_score", "construction_index", "tanker_cost_index"]
+
+
+def supply_demand_ratio(supply, demand):
+    # Python's round() per value so batched rows match single predictions exactly
+    if np.ndim(supply) == 0 and np.ndim(demand) == 0:
+        return round(float(supply / max(demand, 1)), 3)
+    ratio = np.asarray(supply, dtype=float) / np.maximum(np.asarray(demand, dtype=float), 1)
+    return np.array([round(v, 3) for v in ratio.ravel().tolist()]).reshape(ratio.shape)
+
+
+# Live engines, so a worker can resize the thread pools of those built before it forked
+_engines = weakref.WeakSet()
+
+
+def set_inference_threads(n):
+    """Use ``n`` native threads in every engine, current and future."""
+    global INFERENCE_THREADS
+    INFERENCE_THREADS = n
+    for engine in list(_engines):
+        engine.set_threads(n)
+
+
+def _iteration_range(booster):
+    # Respect early stopping the same way XGBClassifier.predict_proba does
+    best = booster.attr("best_iteration")
+    return (0, int(best) + 1) if best is not None else (0, 0)
+
+
+class InferenceEngine:
+    """Direct booster inference with the feature layout fixed at load time.
+
+    Every locality gets a precomputed float32 base row holding its one-hot
+    encoding and static locality features, so building a prediction row is a
+    row copy plus a handful of column writes. Rows are scored with
+    ``inplace_predict`` (no DMatrix, no DataFrame, no second predict call).
+
+    ``fingerprint`` identifies the model files the engine was loaded from,
+    the same in every process and on every host serving them.
+    """
+
+    def __init__(self, booster, categories, labels, localities, fingerprint=None):
+        self.booster = booster
+        self.fingerprint = fingerprint
+        self.categories = [str(c) for c in categories]
+        self.labels = [str(l) for l in labels]
+        self.n_features = len(self.categories) + len(NUMERIC_FEATURES)
+        self.col = {name: len(self.categories) + i for i, name in enumerate(NUMERIC_FEATURES)}
+        self.iteration_range = _iteration_range(booster)
+
+        if booster.num_features() != self.n_features:
+            raise ValueError(
+                f"Model expects {booster.num_features()} features, layout has {self.n_features}"
+            )
+
+        # Rows are indexed by the LocalityTable's integer ids; its name -> id
+        # map is shared, not copied, by every engine built from the table
+        self.localities = localities.names
+        self.locality_index = localities.ids
+        cat_ids = localities.category_ids(self.categories)
+        known = cat_ids >= 0
+        self.base_rows = np.zeros((len(localities), self.n_features), dtype=np.float32)
+        # Unknown categories stay all-zero, like OneHotEncoder(handle_unknown="ignore")
+        self.base_rows[np.flatnonzero(known), cat_ids[known]] = 1.0
+        self.base_rows[:, [self.col[f] for f in LOCALITY_FEATURES]] = localities.features
+
+        self._local = threading.local()
+        self.set_threads(INFERENCE_THREADS)
+        _engines.add(self)
+
+    @classmethod
+    def from_pipeline(cls, pipeline, label_encoder, localities, backend="xgboost", fingerprint=None):
+        """Build from the backend's sklearn Pipeline (ColumnTransformer + XGBClassifier).
+
+        ``backend="numpy"`` scores with the flattened trees instead of the booster.
+        """
+        prep = pipeline.named_steps["prep"]
+        num_cols = [cols for name, _, cols in prep.transformers if name == "num"][0]
+        if list(num_cols) != NUMERIC_FEATURES:
+            raise ValueError(f"Unexpected numeric feature order in pipeline: {num_cols}")
+        categories = prep.named_transformers_["cat"].categories_[0]
+        booster = pipeline.named_steps["xgb"].get_booster()
+        if backend == "numpy":
+            from .trees import TreeEnsemble
+            booster = TreeEnsemble.from_booster(booster)
+        return cls(booster, categories, label_encoder.classes_, localities, fingerprint)
+
+    def set_threads(self, n):
+        # The NumPy backend runs on the calling thread only
+        if n > 0 and hasattr(self.booster, "set_param"):
+            self.booster.set_param({"nthread": n})
+
+    def _buffer(self):
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = np.empty((1, self.n_features), dtype=np.float32)
+        return buf
+
+    def build(self, loc_idx, household, weather, dates, out=None, locality_features=None):
+        """Fill feature rows, one per entry of ``dates``.
+
+        ``loc_idx``, and every value in the ``household`` and ``weather``
+        mappings, may be a scalar shared by all rows or a per-row sequence.
+        ``locality_features`` (same form) overrides the localities' own
+        profile, for rows scored at arbitrary coordinates.
+        """
+        with timed("features"):
+            X = out if out is not None else np.empty((len(dates), self.n_features), dtype=np.float32)
+            X[:] = self.base_rows[loc_idx]
+            col = self.col
+            for f in HOUSEHOLD_FIELDS:
+                X[:, col[f]] = household[f]
+            X[:, col["avg_supply_demand_ratio"]] = supply_demand_ratio(
+                household["avg_supply_liters"], household["avg_demand_liters"]
+            )
+            for f in WEATHER_FEATURES:
+                X[:, col[f]] = weather[f]
+            if locality_features is not None:
+                for f in LOCALITY_FEATURES:
+                    X[:, col[f]] = locality_features[f]
+            if len(dates) == 1:
+                dt = dates[0]
+                X[:, col["day"]], X[:, col["month"]], X[:, col["weekday"]] = dt.day, dt.month, dt.weekday()
+            else:
+                X[:, col["day"]] = [dt.day for dt in dates]
+                X[:, col["month"]] = [dt.month for dt in dates]
+                X[:, col["weekday"]] = [dt.weekday() for dt in dates]
+        return X
+
+    def predict_proba(self, X):
+        with timed("inference"):
+            return self.booster.inplace_predict(X, iteration_range=self.iteration_range, validate_features=False)
+
+    @property
+    def supports_contributions(self):
+        # The flattened trees of the NumPy backend carry no node covers
+        return hasattr(self.booster, "save_raw")
+
+    def contributions(self, X, approx=False):
+        """SHAP values of every feature (and the bias, last) to each class
+        margin, shape (rows, classes, features + 1). ``approx`` uses
+        xgboost's faster path-based approximation.
+        """
+        if not self.supports_contributions:
+            raise ValueError("Feature contributions need INFERENCE_BACKEND=xgboost")
+        import xgboost as xgb
+
+        with timed("inference"):
+            return self.booster.predict(
+                xgb.DMatrix(X), pred_contribs=True, approx_contribs=approx,
+                iteration_range=self.iteration_range, validate_features=False,
+            )
+
+    def predict_one(self, locality, household, weather, dt, locality_features=None):
+        """Label and class probabilities for a single household/date."""
+        X = self.build(self.locality_index[locality], household, weather, (dt,), out=self._buffer(),
+                       locality_features=locality_features)
+        return self.label_probs(self.predict_proba(X)[0])
+
+    def label_probs(self, proba):
+        """(label, {class: probability}) for one row of ``predict_proba``."""
+        return self.labels[int(np.argmax(proba))], {cls: float(p) for cls, p in zip(self.labels, proba)}
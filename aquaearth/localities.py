@@ -0,0 +1,131 @@
+import csv
+import logging
+import os
+
+import numpy as np
+
+from .inference import LOCALITY_FEATURES
+
+logger = logging.getLogger(__name__)
+
+# Versioned locality metadata; a deployment can point at its own table
+LOCALITY_TABLE_PATH = os.environ.get(
+    "LOCALITY_TABLE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "localities.csv")
+)
+COLUMNS = ["name", "lat", "lon", *LOCALITY_FEATURES]
+
+
+class LocalityTable:
+    """Locality metadata as columns of one NumPy structured array.
+
+    Row ``i`` is the locality with integer id ``i``; ``ids`` maps names to
+    ids, so a lookup is one dict probe whatever the table's size, and
+    every per-locality array built from the table (engine base rows,
+    spatial index, profiles) is indexed by the same id. ``features`` is
+    the (rows, LOCALITY_FEATURES) float matrix.
+    """
+
+    def __init__(self, data, version=None, path=None):
+        self.data = data
+        self.version = version
+        self.path = path
+        self.names = data["name"].tolist()
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.lat = data["lat"]
+        self.lon = data["lon"]
+        self.features = np.column_stack([data[f] for f in LOCALITY_FEATURES])
+        self._validate()
+
+    @classmethod
+    def from_rows(cls, rows, version=None, path=None):
+        """Table from (name, lat, lon, *LOCALITY_FEATURES) tuples."""
+        rows = list(rows)
+        width = max((len(r[0]) for r in rows), default=1)
+        dtype = [("name", f"U{width}"), ("lat", "f8"), ("lon", "f8")] + [(f, "f8") for f in LOCALITY_FEATURES]
+        return cls(np.array([tuple(r) for r in rows], dtype=dtype), version, path)
+
+    @classmethod
+    def load(cls, path=LOCALITY_TABLE_PATH):
+        """Read a table file: ``# key: value`` comment lines, one of them the
+        required ``version``, then CSV with a header row naming COLUMNS.
+
+        Raises ValueError for a malformed file.
+        """
+        meta = {}
+        with open(path, newline="") as f:
+            lines = []
+            for line in f:
+                if line.startswith("#"):
+                    key, sep, value = line[1:].partition(":")
+                    if sep:
+                        meta[key.strip()] = value.strip()
+                elif line.strip():
+                    lines.append(line)
+        if "version" not in meta:
+            raise ValueError(f"{path}: no '# version:' line")
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header != COLUMNS:
+            raise ValueError(f"{path}: expected columns {','.join(COLUMNS)}, got {','.join(header or [])}")
+        rows = []
+        for n, row in enumerate(reader, start=2):
+            if len(row) != len(COLUMNS):
+                raise ValueError(f"{path}: row {n} has {len(row)} fields, expected {len(COLUMNS)}")
+            try:
+                rows.append((row[0].strip(), *(float(v) for v in row[1:])))
+            except ValueError:
+                raise ValueError(f"{path}: row {n} has a non-numeric value") from None
+        table = cls.from_rows(rows, meta["version"], path)
+        logger.info(f"Locality table {table.version} loaded from {path}: {len(table)} localities")
+        return table
+
+    def _validate(self):
+        if len(self.ids) != len(self.names):
+            seen = set()
+            dupes = sorted({n for n in self.names if n in seen or seen.add(n)})
+            raise ValueError(f"Duplicate localities: {', '.join(dupes[:5])}")
+        if "" in self.ids:
+            raise ValueError("Locality with an empty name")
+        bad = ~((np.abs(self.lat) <= 90) & (np.abs(self.lon) <= 180))
+        if bad.any():
+            raise ValueError(f"Invalid coordinates for {self.names[int(np.argmax(bad))]}")
+        if not np.isfinite(self.features).all():
+            raise ValueError("Non-finite locality feature values")
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def coords(self, i):
+        """(lat, lon) of locality ``i`` as Python floats."""
+        return float(self.lat[i]), float(self.lon[i])
+
+    def category_ids(self, categories):
+        """Position in ``categories`` of every locality, -1 for localities
+        the model has no one-hot column for.
+
+        Logs both directions of a mismatch and raises ValueError when the
+        table and the model share no locality at all (the wrong table for
+        this model).
+        """
+        cat_index = {str(c): i for i, c in enumerate(categories)}
+        ids = np.array([cat_index.get(name, -1) for name in self.names], dtype=np.intp)
+        unknown = int((ids < 0).sum())
+        if unknown == len(ids) and len(ids):
+            raise ValueError(f"None of the {len(ids)} localities in table {self.version} are known to the model")
+        if unknown:
+            # InferenceEngine leaves their one-hot columns all zero
+            sample = [self.names[i] for i in np.flatnonzero(ids < 0)[:5]]
+            logger.warning(f"{unknown} of {len(ids)} localities have no model category, e.g. {', '.join(sample)}")
+        missing = len(cat_index) - (len(ids) - unknown)
+        if missing:
+            logger.warning(f"{missing} model categories are not in locality table {self.version}")
+        return ids
+
+    def stats(self):
+        return {"version": self.version, "path": self.path, "localities": len(self)}
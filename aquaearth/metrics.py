@@ -0,0 +1,188 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Stages a request is broken into, in Server-Timing order ("queue" is the
+# wait for a micro-batched model call to start)
+STAGES = ["weather", "upstream", "features", "queue", "inference", "serialize"]
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values."""
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            sep = "," if labels else ""
+            braced = f"{{{labels}}}" if labels else ""
+            total = 0
+            for bound, count in zip(self.buckets, series):
+                total += count
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {total}')
+            total += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {total}')
+            lines.append(f"{self.name}_sum{braced} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{braced} {total}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+request_seconds = Histogram(
+    "aquaearth_request_duration_seconds", "Request latency until the response starts.", ["route", "status"]
+)
+stage_seconds = Histogram(
+    "aquaearth_stage_duration_seconds", "Wall time per request spent in each stage.", ["route", "stage"]
+)
+cache_lookups = Counter("aquaearth_cache_lookups_total", "Cache lookups by result.", ["cache", "result"])
+batch_rows = Histogram(
+    "aquaearth_microbatch_rows", "Feature rows per micro-batched model call.", [], buckets=BATCH_BUCKETS
+)
+batch_requests = Histogram(
+    "aquaearth_microbatch_requests", "Requests coalesced into one micro-batched model call.", [],
+    buckets=BATCH_BUCKETS,
+)
+batch_wait_seconds = Histogram(
+    "aquaearth_microbatch_queue_wait_seconds", "Time a request waits for its micro-batch to start.", []
+)
+METRICS = [request_seconds, stage_seconds, cache_lookups, batch_rows, batch_requests, batch_wait_seconds]
+
+
+class RequestTiming:
+    """Stage timings of one request.
+
+    A stage's time is the wall time during which at least one operation of
+    that stage was running, so concurrent weather fetches of a batch are
+    not counted twice.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {}
+        self.cache = {}
+        self.endpoint_done = None
+        self._active = {}
+        self._since = {}
+
+    def enter(self, stage):
+        if self._active.get(stage, 0) == 0:
+            self._since[stage] = time.perf_counter()
+        self._active[stage] = self._active.get(stage, 0) + 1
+
+    def exit(self, stage):
+        self._active[stage] -= 1
+        if self._active[stage] == 0:
+            self.durations[stage] = self.durations.get(stage, 0.0) + time.perf_counter() - self._since[stage]
+
+    def add(self, stage, seconds):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def server_timing(self, total):
+        parts = []
+        for stage in STAGES:
+            if stage in self.durations:
+                part = f"{stage};dur={self.durations[stage] * 1000:.2f}"
+                if stage == "weather" and self.cache:
+                    part += ';desc="' + " ".join(f"{r}={n}" for r, n in sorted(self.cache.items())) + '"'
+                parts.append(part)
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current = ContextVar("aquaearth_request_timing", default=None)
+
+
+def start_request():
+    """Begin timing a request in the current context; returns (timing, token)."""
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_timing():
+    return _current.get()
+
+
+@contextmanager
+def timed(stage):
+    """Attribute the enclosed block to ``stage`` of the current request."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    timing.enter(stage)
+    try:
+        yield
+    finally:
+        timing.exit(stage)
+
+
+def add_time(stage, seconds):
+    """Attribute ``seconds`` measured elsewhere (e.g. in a shared batch) to ``stage``."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(stage, seconds)
+
+
+def note_cache(cache, result):
+    """Count a cache lookup (hit / miss / coalesced / stale) and tag the current request."""
+    cache_lookups.inc(cache, result)
+    timing = _current.get()
+    if timing is not None:
+        key = f"{cache}_{result}"
+        timing.cache[key] = timing.cache.get(key, 0) + 1
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import os
+import time
+
+import numpy as np
+
+from .cache import retrieve_exception
+from .metrics import add_time, batch_requests, batch_rows, batch_wait_seconds
+
+# Longest a request waits for others to share its model call. 0 coalesces
+# the requests that reach the model in the same event-loop iteration, which
+# costs no latency; a timer window trades p50 for bigger batches
+MICROBATCH_WINDOW_MS = float(os.environ.get("PREDICT_MICROBATCH_WINDOW_MS", 0))
+# A batch is run as soon as it holds this many rows
+MICROBATCH_MAX_ROWS = int(os.environ.get("PREDICT_MICROBATCH_MAX_ROWS", 256))
+MICROBATCH_ENABLED = os.environ.get("PREDICT_MICROBATCH", "1") == "1"
+
+
+class _Batch:
+    def __init__(self, engine):
+        self.engine = engine
+        self.rows = []
+        self.n_rows = 0
+        self.created = time.perf_counter()
+        self.started = self.finished = None
+        self.done = asyncio.get_running_loop().create_future()
+        retrieve_exception(self.done)
+        self.timer = None
+
+
+class MicroBatcher:
+    """Coalesces the small model calls of concurrent requests.
+
+    Feature rows submitted within ``window_ms`` of a batch's first row (or
+    until it holds ``max_rows``) are stacked and scored with a single
+    ``predict_proba``; each request gets back its own slice. Batches are
+    kept per engine, so a request never switches model mid-flight when a
+    new version is swapped in.
+
+    The shared call runs inline on the event loop, as the single-row calls
+    it replaces did: a thread hop costs more than scoring a few hundred
+    rows. The time a request waits is reported as its "queue" stage, the
+    shared model call as "inference".
+    """
+
+    def __init__(self, window_ms=MICROBATCH_WINDOW_MS, max_rows=MICROBATCH_MAX_ROWS, enabled=MICROBATCH_ENABLED):
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.enabled = enabled
+        self._pending = {}  # id(engine) -> _Batch still collecting rows
+        self.batches = 0
+        self.rows = 0
+
+    async def predict_proba(self, engine, X):
+        """``engine.predict_proba(X)``, shared with other callers' rows."""
+        if not self.enabled or len(X) >= self.max_rows:
+            return engine.predict_proba(X)
+
+        enqueued = time.perf_counter()
+        batch = self._pending.get(id(engine))
+        if batch is None or batch.n_rows + len(X) > self.max_rows:
+            if batch is not None:
+                contextvars.Context().run(self._flush, batch)
+            batch = self._pending[id(engine)] = _Batch(engine)
+            # Flushes run outside any request's context, so no single
+            # request is billed for the shared call
+            loop = asyncio.get_running_loop()
+            if self.window > 0:
+                batch.timer = loop.call_later(self.window, self._flush, batch, context=contextvars.Context())
+            else:
+                batch.timer = loop.call_soon(self._flush, batch, context=contextvars.Context())
+        offset = batch.n_rows
+        batch.rows.append(X)
+        batch.n_rows += len(X)
+        if batch.n_rows >= self.max_rows:
+            contextvars.Context().run(self._flush, batch)
+
+        proba = await asyncio.shield(batch.done)
+        # Every request is billed the shared call, not the delay before the
+        # event loop got back to it
+        add_time("queue", batch.started - enqueued)
+        add_time("inference", batch.finished - batch.started)
+        return proba[offset:offset + len(X)]
+
+    def _flush(self, batch):
+        if batch.started is not None:
+            return
+        if self._pending.get(id(batch.engine)) is batch:
+            del self._pending[id(batch.engine)]
+        batch.timer.cancel()
+        batch.started = time.perf_counter()
+        self.batches += 1
+        self.rows += batch.n_rows
+        batch_rows.observe(batch.n_rows)
+        batch_requests.observe(len(batch.rows))
+        batch_wait_seconds.observe(batch.started - batch.created)
+        X = batch.rows[0] if len(batch.rows) == 1 else np.concatenate(batch.rows)
+        try:
+            batch.done.set_result(batch.engine.predict_proba(X))
+        except Exception as e:
+            batch.done.set_exception(e)
+        batch.finished = time.perf_counter()
+
+    async def predict_one(self, engine, locality, household, weather, dt, locality_features=None):
+        """``engine.predict_one`` through the shared model call."""
+        X = engine.build(engine.locality_index[locality], household, weather, (dt,),
+                         locality_features=locality_features)
+        return engine.label_probs((await self.predict_proba(engine, X))[0])
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_rows": self.max_rows,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_rows_per_batch": round(self.rows / self.batches, 2) if self.batches else None,
+        }
@@ -0,0 +1,88 @@
+import functools
+import inspect
+import logging
+import time
+
+from fastapi.routing import APIRoute
+
+from .metrics import current_timing, end_request, request_seconds, stage_seconds, start_request
+
+logger = logging.getLogger("aquaearth.access")
+
+
+def _mark_endpoint_done():
+    timing = current_timing()
+    if timing is not None:
+        timing.endpoint_done = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records when the endpoint returned, so the time until
+    the response starts is attributed to serialization."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapped(*args, **kw):
+                try:
+                    return await endpoint(*args, **kw)
+                finally:
+                    _mark_endpoint_done()
+        else:
+            @functools.wraps(endpoint)
+            def wrapped(*args, **kw):
+                try:
+                    return endpoint(*args, **kw)
+                finally:
+                    _mark_endpoint_done()
+        super().__init__(path, wrapped, **kwargs)
+
+
+class TimingMiddleware:
+    """ASGI middleware: per-stage timings, Server-Timing header, metrics and
+    one structured access-log record per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing, token = start_request()
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                if timing.endpoint_done is not None:
+                    timing.add("serialize", now - timing.endpoint_done)
+                total = now - timing.start
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing(total).encode()))
+                # Lets the cross-origin frontend read Server-Timing too
+                headers.append((b"timing-allow-origin", b"*"))
+                message = {**message, "headers": headers}
+
+                route = scope.get("route")
+                route_path = route.path if route is not None else "unmatched"
+                request_seconds.observe(total, route_path, message["status"])
+                for stage, seconds in timing.durations.items():
+                    stage_seconds.observe(seconds, route_path, stage)
+                logger.info(
+                    "%s %s %s %.1fms", scope["method"], scope["path"], message["status"], total * 1000,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": message["status"],
+                        "duration_ms": round(total * 1000, 2),
+                        "stages_ms": {s: round(d * 1000, 2) for s, d in timing.durations.items()},
+                        "cache": timing.cache,
+                    },
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            end_request(token)
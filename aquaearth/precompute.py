@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+
+from .cache import TTLCache
+from .forecast import FORECAST_MAX_DAYS, FORECAST_PAST_DAYS, ForecastBlock
+from .metrics import note_cache, timed
+from .weather import fetch_forecast_weather, fetch_forecast_weather_many
+
+logger = logging.getLogger(__name__)
+
+FORECAST_REFRESH_INTERVAL = float(os.environ.get("FORECAST_REFRESH_INTERVAL", 1800))
+# Blocks older than this are still served, but flagged as stale
+FORECAST_STALE_AFTER = float(os.environ.get("FORECAST_STALE_AFTER", 2 * FORECAST_REFRESH_INTERVAL))
+# Blocks kept for weather cells requested by coordinate (not a known locality's cell)
+FORECAST_CELL_CACHE_SIZE = int(os.environ.get("FORECAST_CELL_CACHE_SIZE", 1024))
+
+
+class ForecastFeatureBlocks:
+    """Per-locality forecast feature blocks kept warm off the request path.
+
+    ``start()`` runs a refresh of every locality (one multi-coordinate
+    upstream request) every ``interval`` seconds. Requests read the current
+    block and only add their household features. Blocks cover
+    FORECAST_MAX_DAYS days, so every horizon is served from the same
+    refresh. A block older than
+    ``interval`` triggers a background refresh but is still returned
+    (stale-while-revalidate); only a locality with no block at all waits
+    for a fetch. A locality whose block fails to build keeps its previous
+    one; the error is kept in ``errors`` until a refresh succeeds.
+
+    ``get_point()`` serves coordinate requests: each weather grid cell is
+    fetched on first use and cached for ``interval`` seconds.
+    """
+
+    def __init__(self, localities, interval=FORECAST_REFRESH_INTERVAL, stale_after=FORECAST_STALE_AFTER):
+        self.localities = localities
+        self.interval = interval
+        self.stale_after = stale_after
+        self.blocks = {}
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        # Per locality: the error of its last refresh, until one succeeds
+        self.errors = {}
+        self._refreshing = None
+        self._task = None
+        self.cells = TTLCache(maxsize=FORECAST_CELL_CACHE_SIZE, ttl=interval, name="forecast_cells")
+
+    async def _refresh(self):
+        coords = list(zip(self.localities.lat.tolist(), self.localities.lon.tolist()))
+        dailies = await fetch_forecast_weather_many(coords, FORECAST_PAST_DAYS, FORECAST_MAX_DAYS, refresh=True)
+        for name, daily in zip(self.localities.names, dailies):
+            # One locality's bad series must not cost the others their
+            # refresh; it keeps serving its previous block
+            try:
+                self.blocks[name] = ForecastBlock(daily)
+            except Exception as e:
+                self.errors[name] = repr(e)
+                logger.warning(f"Forecast features for {name} failed: {e!r}")
+            else:
+                self.errors.pop(name, None)
+        self.refreshes += 1
+        self.last_error = None
+
+    async def refresh(self):
+        """Refresh all blocks; concurrent callers share one refresh."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+            self._refreshing.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._refreshing)
+
+    def _refresh_done(self, task):
+        self._refreshing = None
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+            self.last_error = repr(task.exception())
+            logger.warning(f"Forecast feature refresh failed: {self.last_error}")
+
+    async def get(self, locality):
+        """Return (block, age_seconds, stale) for ``locality``."""
+        with timed("weather"):
+            block = self.blocks.get(locality)
+            if block is None:
+                result = "miss"
+                await self.refresh()
+                block = self.blocks.get(locality)
+                if block is None:
+                    raise ValueError(f"No forecast weather for {locality}: {self.errors.get(locality)}")
+            else:
+                result = "hit"
+                if block.age > self.interval and self._refreshing is None:
+                    # Serve what we have and revalidate in the background
+                    asyncio.ensure_future(self.refresh()).add_done_callback(lambda t: t.cancelled() or t.exception())
+            age = block.age
+            stale = age > self.stale_after
+            note_cache("forecast_blocks", "stale" if stale else result)
+            return block, age, stale
+
+    async def get_point(self, lat, lon):
+        """Return (block, age_seconds, stale) for the weather cell at (lat, lon),
+        as snapped by Locations.resolve."""
+        cell = (lat, lon)
+        with timed("weather"):
+            block = await self.cells.get_or_load(cell, lambda: self._load_cell(*cell))
+            return block, block.age, False
+
+    async def get_for(self, place):
+        """get() for a named Location, get_point() for one resolved from coordinates."""
+        if place.info is None:
+            return await self.get(place.locality)
+        return await self.get_point(place.lat, place.lon)
+
+    async def _load_cell(self, lat, lon):
+        return ForecastBlock(await fetch_forecast_weather(lat, lon, FORECAST_PAST_DAYS, FORECAST_MAX_DAYS))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # logged by _refresh_done; keep serving the previous blocks
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        ages = [b.age for b in self.blocks.values()]
+        return {
+            "localities": len(self.blocks),
+            "interval_seconds": self.interval,
+            "oldest_block_age_seconds": round(max(ages), 1) if ages else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "locality_errors": dict(self.errors),
+            "scheduler_running": self._task is not None and not self._task.done(),
+            "cells": self.cells.stats(),
+        }
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Annotated
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .backtest import backtest
+from .batch import MAX_BATCH_SIZE, predict_batch
+from .encoding import COLUMNS, NDJSON, ROWS, FastJSONResponse, negotiate, respond
+from .forecast import FORECAST_DAYS, by_locality, check_days, score_blocks, score_blocks_batched
+from .httpcache import archive_max_age, cached_response, canonical_redirect, make_etag
+from .middleware import TimedRoute
+from .sweep import scenario_sweep
+from .weather import fetch_last30_days_weather
+
+logger = logging.getLogger(__name__)
+
+
+class HouseholdProfile(BaseModel):
+    household_size: int
+    usage_per_person_lpd: float
+    avg_demand_liters: int
+    avg_supply_liters: int
+    avg_supply_hours: float
+    tanker_trips_30d: int
+    tanker_days_30d: int
+
+
+class PredictRequest(HouseholdProfile):
+    prediction_date: str
+    # A supported locality name, or any coordinate near one
+    locality: str | None = None
+    lat: float | None = None
+    lon: float | None = None
+
+
+class ForecastRequest(PredictRequest):
+    # Forecast days from today, up to FORECAST_MAX_DAYS
+    days: int = FORECAST_DAYS
+
+
+class BacktestRequest(HouseholdProfile):
+    start_date: str
+    end_date: str
+    locality: str | None = None
+    lat: float | None = None
+    lon: float | None = None
+
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float
+    num: int = 10
+
+
+class ScenarioSweepRequest(BaseModel):
+    base: PredictRequest
+    # Household field -> list of values, or an evenly spaced range
+    sweep: dict[str, list[float] | SweepRange]
+    contributions: bool = False
+    approx_contribs: bool = False
+
+
+async def upstream_unavailable(request, exc):
+    """Exception handler for UpstreamUnavailable: a 503 instead of a 500."""
+    logger.warning(f"Weather upstream unavailable: {exc}")
+    return JSONResponse(status_code=503, content={"error": "Weather service unavailable"})
+
+
+def set_weather_age(response, age, stale):
+    response.headers["X-Weather-Age"] = str(int(age))
+    if stale:
+        response.headers["X-Weather-Stale"] = "1"
+
+
+def forecast_router(get_engine, localities, locations, forecast_blocks, batcher, parse_date):
+    """The prediction endpoints both servers mount.
+
+    ``get_engine()`` is awaited for the engine that serves a request, or
+    None while no model is loaded. Handlers await it only after their
+    weather is fetched, so a model still loading in the background overlaps
+    that I/O. ``parse_date`` turns a request's date string into a datetime.
+    """
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post("/predict_week")
+    async def predict_week(req: PredictRequest):
+        return await _predict_week(req)
+
+    # Same result as the POST, cacheable by browsers and the CDN: one canonical
+    # URL per input, an ETag over model, weather window and inputs, and a
+    # max-age that runs out when the weather window can next change
+    @router.get("/predict_week")
+    async def predict_week_get(req: Annotated[PredictRequest, Query()], request: Request):
+        redirect = canonical_redirect(request, req.model_dump())
+        if redirect is not None:
+            return redirect
+        return await _predict_week(req, request)
+
+    async def _predict_week(req, request=None):
+        try:
+            place = locations.resolve(req.locality, req.lat, req.lon)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        dt = parse_date(req.prediction_date)
+        weather = await fetch_last30_days_weather(place.lat, place.lon, dt)
+
+        engine = await get_engine()
+        if engine is None:
+            return {"error": "Model not loaded. Please train the model first."}
+
+        async def build():
+            pred_label, probs = await batcher.predict_one(engine, place.locality, req.model_dump(), weather, dt,
+                                                          place.feature_override)
+
+            result = {
+                "week_prediction": pred_label,
+                "probabilities": probs,
+                "forecast_range": {
+                    "start": str(dt.date()),
+                    "end": str((dt + timedelta(days=6)).date())
+                },
+                "weather_data": weather
+            }
+            if place.info is not None:
+                result["location"] = place.info
+            return result
+
+        if request is None:
+            return await build()
+        etag = make_etag(engine.fingerprint, localities.version, req.model_dump(), weather)
+        return await cached_response(request, etag, archive_max_age(dt), build)
+
+    @router.post("/predict_batch")
+    async def predict_week_batch(reqs: list[PredictRequest], request: Request):
+        if len(reqs) > MAX_BATCH_SIZE:
+            return {"error": f"Batch too large: {len(reqs)} rows (max {MAX_BATCH_SIZE})"}
+
+        engine = await get_engine()
+        if engine is None:
+            return {"error": "Model not loaded. Please train the model first."}
+
+        # Rows are grouped by (locality, date) so each weather window is fetched once;
+        # the Accept header picks rows, columns or an NDJSON stream
+        table = await predict_batch(engine, reqs, locations, parse_date)
+        return respond(request, table)
+
+    @router.post("/forecast_7day")
+    async def forecast_7day(req: PredictRequest, request: Request):
+        return await _forecast(req, request, FORECAST_DAYS)
+
+    # Cacheable like GET /predict_week, until the next forecast block refresh
+    @router.get("/forecast_7day")
+    async def forecast_7day_get(req: Annotated[PredictRequest, Query()], request: Request):
+        redirect = canonical_redirect(request, req.model_dump())
+        if redirect is not None:
+            return redirect
+        return await _forecast(req, request, FORECAST_DAYS, cacheable=True)
+
+    # /forecast_7day with a horizon of 1 to FORECAST_MAX_DAYS days
+    @router.post("/forecast")
+    async def forecast(req: ForecastRequest, request: Request):
+        return await _forecast(req, request, req.days)
+
+    @router.get("/forecast")
+    async def forecast_get(req: Annotated[ForecastRequest, Query()], request: Request):
+        redirect = canonical_redirect(request, req.model_dump())
+        if redirect is not None:
+            return redirect
+        return await _forecast(req, request, req.days, cacheable=True)
+
+    async def _forecast(req, request, days, cacheable=False):
+        try:
+            place = locations.resolve(req.locality, req.lat, req.lon)
+            check_days(days)
+            # Weather window features come precomputed from the background refresh;
+            # only the household features are added per request, and every day of
+            # the horizon is scored in one booster call
+            block, age, stale = await forecast_blocks.get_for(place)
+        except ValueError as e:
+            return {"error": str(e)}
+        if days > block.horizon:
+            return {"error": f"Only {block.horizon} forecast days available"}
+        engine = await get_engine()
+        if engine is None:
+            return {"error": "Model not loaded"}
+        profiles = [place.features] if place.info is not None else None
+
+        async def build():
+            table = await score_blocks_batched(batcher, engine, [place.locality], req.model_dump(), [block],
+                                               profiles, days)
+            return respond(request, table)
+
+        if cacheable:
+            etag = make_etag(engine.fingerprint, localities.version, req.model_dump(), block.digest,
+                             negotiate(request.headers.get("accept")))
+            response = await cached_response(request, etag, forecast_blocks.interval - age, build, vary="Accept")
+        else:
+            response = await build()
+        set_weather_age(response, age, stale)
+        return response
+
+    @router.post("/backtest")
+    async def backtest_range(req: BacktestRequest, request: Request):
+        # One archive fetch for the whole range, one booster call for all days;
+        # the per-day results are streamed as NDJSON unless columns or rows are asked for
+        try:
+            place = locations.resolve(req.locality, req.lat, req.lon)
+            start = parse_date(req.start_date)
+            end = parse_date(req.end_date)
+            engine = await get_engine()
+            if engine is None:
+                return {"error": "Model not loaded"}
+            table = await backtest(engine, place, req.model_dump(), start, end)
+        except ValueError as e:
+            return {"error": str(e)}
+        return respond(request, table, offers=(NDJSON, ROWS, COLUMNS))
+
+    @router.post("/scenario_sweep")
+    async def sweep_scenarios(req: ScenarioSweepRequest):
+        # One weather window for the base request, one booster call for the grid
+        base = req.base
+        try:
+            place = locations.resolve(base.locality, base.lat, base.lon)
+            dt = parse_date(base.prediction_date)
+            engine = await get_engine()
+            if engine is None:
+                return {"error": "Model not loaded"}
+            return FastJSONResponse(await scenario_sweep(engine, place, base.model_dump(), dt, req.model_dump()["sweep"],
+                                                         req.contributions, req.approx_contribs))
+        except ValueError as e:
+            return {"error": str(e)}
+
+    @router.post("/citywide_forecast")
+    async def citywide_forecast(profile: HouseholdProfile, request: Request):
+        # Precomputed blocks for every locality, one booster call for the localities x 7 days grid
+        names = localities.names
+        try:
+            got = await asyncio.gather(*(forecast_blocks.get(name) for name in names))
+            engine = await get_engine()
+            if engine is None:
+                return {"error": "Model not loaded"}
+            # The whole grid is one booster call; keep it off the event loop
+            table = await asyncio.to_thread(score_blocks, engine, names, profile.model_dump(),
+                                            [block for block, _, _ in got], locality_column=True)
+        except ValueError as e:
+            return {"error": str(e)}
+        # Rows grouped per locality by default; columns or NDJSON hold one row per locality-day
+        response = respond(request, table, by_locality)
+        set_weather_age(response, max(age for _, age, _ in got), any(stale for _, _, stale in got))
+        return response
+
+    return router
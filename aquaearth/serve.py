@@ -0,0 +1,131 @@
+import argparse
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from .inference import INFERENCE_THREADS, set_inference_threads
+
+logger = logging.getLogger(__name__)
+
+SERVE_WORKERS = int(os.environ.get("SERVE_WORKERS", 1))
+# A worker that dies sooner than this after starting is not restarted
+# again, so a crash at startup cannot turn into a fork loop
+MIN_WORKER_UPTIME = 5.0
+
+
+def worker_threads(workers, threads=INFERENCE_THREADS):
+    """Native threads per worker: ``threads`` if set, else the cores split
+    evenly between workers (at least one each)."""
+    if threads > 0:
+        return threads
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def serve(app, host="0.0.0.0", port=8000, workers=SERVE_WORKERS, threads=INFERENCE_THREADS, log_level="info"):
+    """Serve ``app`` from ``workers`` uvicorn processes sharing one socket.
+
+    The app, and with it the model, is already loaded when the workers are
+    forked, so they share those pages copy-on-write instead of each loading
+    a copy (a LazyEngine warm-up still running is waited for). Each worker runs
+    ``threads`` native inference threads, by default the cores split
+    between workers, so N workers never run N x cores OpenMP threads. A
+    worker that dies is replaced. Without fork() (Windows), or with one
+    worker, this is plain ``uvicorn.run``.
+
+    Returns in the parent once every worker has stopped, and in each
+    worker once its server has stopped.
+    """
+    if workers <= 1 or not hasattr(os, "fork"):
+        if threads > 0:
+            set_inference_threads(threads)
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+
+    threads = worker_threads(workers, threads)
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    config = uvicorn.Config(app, log_level=log_level)
+    logger.info(f"Serving on {host}:{port} with {workers} workers x {threads} inference threads")
+
+    children = {}  # pid -> start time
+
+    def spawn():
+        """Fork a worker; True in the worker once its server has stopped."""
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            set_inference_threads(threads)
+            uvicorn.Server(config).run(sockets=[sock])
+            return True
+        children[pid] = time.monotonic()
+        return False
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        if spawn():
+            return
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            logger.error(f"Worker {pid} exited with {code} right after starting; not restarting it")
+        else:
+            logger.warning(f"Worker {pid} exited with {code}; starting a replacement")
+            if spawn():
+                return
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve an AquaEarth app from forked uvicorn workers, e.g. from the repository root: "
+                    "python -m aquaearth.serve app:app --app-dir backend --workers 4 --threads 1"
+    )
+    parser.add_argument("app", help="module:attribute, e.g. app:app or index:app")
+    parser.add_argument("--app-dir", default=".", help="directory to import the app from and run in, e.g. backend")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=INFERENCE_THREADS,
+                        help="native inference threads per worker (default: cores / workers)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # The apps resolve their model paths relative to their own directory
+    os.chdir(args.app_dir)
+    sys.path.insert(0, os.getcwd())
+    module_name, _, attr = args.app.partition(":")
+    module = importlib.import_module(module_name)
+    serve(getattr(module, attr or "app"), args.host, args.port, args.workers, args.threads, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import math
+import os
+
+import numpy as np
+
+from .inference import LOCALITY_FEATURES
+
+# Open-Meteo serves gridded models, so points closer together than a grid
+# cell get the same weather anyway; snapping them to one cell centre lets
+# them share cache and store entries. Only coordinate requests are snapped;
+# named localities keep their exact coordinates. 0 keeps coordinates as given.
+WEATHER_GRID_DEG = float(os.environ.get("WEATHER_GRID_DEG", 0.1))
+# Profiles blended for a coordinate: 1 takes the nearest locality's profile,
+# more interpolates the nearest ones by inverse squared distance
+LOCALITY_NEIGHBOURS = int(os.environ.get("LOCALITY_NEIGHBOURS", 1))
+# Coordinates farther than this from every known locality are rejected (0: no limit)
+LOCALITY_MAX_DISTANCE_KM = float(os.environ.get("LOCALITY_MAX_DISTANCE_KM", 25))
+
+EARTH_RADIUS_KM = 6371.0
+# Average number of points per index bucket
+POINTS_PER_CELL = 2
+# Rings scanned before switching to a vectorized pass over all buckets
+MAX_RINGS = 6
+
+
+def snap_to_grid(lat, lon, step=WEATHER_GRID_DEG):
+    """Centre of the ``step``-degree weather grid cell holding (lat, lon)."""
+    if step <= 0:
+        return lat, lon
+    return round(round(lat / step) * step, 4), round(round(lon / step) * step, 4)
+
+
+class LocalityIndex:
+    """k-nearest-neighbour lookup over a uniform grid of buckets.
+
+    Points are projected to kilometres (equirectangular around their mean
+    latitude, accurate at city scale) and bucketed into square cells sized
+    for about POINTS_PER_CELL points each. A query scans rings of cells
+    around its own until the k-th best distance is closer than any cell
+    not yet scanned, so it touches a handful of points however many are
+    registered. Queries far outside the points' area, or in sparse
+    regions, fall back after MAX_RINGS rings to ranking every bucket by its
+    distance to the query in one vectorized pass.
+    """
+
+    def __init__(self, lat, lon):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        if lat.size == 0:
+            raise ValueError("LocalityIndex needs at least one point")
+        self._kx = EARTH_RADIUS_KM * math.radians(1) * math.cos(math.radians(float(lat.mean())))
+        self._ky = EARTH_RADIUS_KM * math.radians(1)
+        self.x = lon * self._kx
+        self.y = lat * self._ky
+
+        self.x0, self.y0 = self.x.min(), self.y.min()
+        self.x1, self.y1 = self.x.max(), self.y.max()
+        area = max((self.x1 - self.x0) * (self.y1 - self.y0), 1e-6)
+        self.cell = max(math.sqrt(area * POINTS_PER_CELL / lat.size), 1e-3)
+        cx = ((self.x - self.x0) // self.cell).astype(np.int64)
+        cy = ((self.y - self.y0) // self.cell).astype(np.int64)
+        self.max_ring = int(max(cx.max(), cy.max())) + 1
+
+        order = np.lexsort((cy, cx))
+        bounds = np.flatnonzero(np.diff(cx[order]) | np.diff(cy[order])) + 1
+        self._members = np.split(order, bounds)
+        # Lower-left corner of every non-empty bucket, for _nearest_all
+        self._cell_x = self.x0 + cx[order[np.r_[0, bounds]]] * self.cell
+        self._cell_y = self.y0 + cy[order[np.r_[0, bounds]]] * self.cell
+        self._cells = {
+            (int(cx[idx[0]]), int(cy[idx[0]])): idx
+            for idx in self._members
+        }
+
+    def __len__(self):
+        return len(self.x)
+
+    @staticmethod
+    def _ring(cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest(self, lat, lon, k=1):
+        """Indices and distances (km) of the ``k`` nearest points, closest first."""
+        k = min(k, len(self))
+        x, y = lon * self._kx, lat * self._ky
+        # Rings are searched around the query's projection onto the points'
+        # bounding box. For any point p in the box, |q - p|^2 >= |q - proj|^2
+        # + |proj - p|^2, which bounds the distance to unscanned buckets.
+        px = min(max(x, self.x0), self.x1)
+        py = min(max(y, self.y0), self.y1)
+        outside2 = (x - px) ** 2 + (y - py) ** 2
+        cx = int((px - self.x0) // self.cell)
+        cy = int((py - self.y0) // self.cell)
+
+        found = []
+        count = 0
+        for r in range(min(self.max_ring, MAX_RINGS) + 1):
+            for key in self._ring(cx, cy, r):
+                idx = self._cells.get(key)
+                if idx is not None:
+                    found.append(idx)
+                    count += len(idx)
+            if count < k:
+                continue
+            idx = np.concatenate(found) if len(found) > 1 else found[0]
+            dist = np.hypot(self.x[idx] - x, self.y[idx] - y)
+            order = np.argsort(dist, kind="stable")[:k]
+            # Unscanned buckets are at least r cells away from the projection
+            if r == self.max_ring or dist[order[-1]] ** 2 <= outside2 + (r * self.cell) ** 2:
+                return idx[order], dist[order]
+        return self._nearest_all(x, y, k)
+
+    def _nearest_all(self, x, y, k):
+        # Squared distance from the query to every bucket's square
+        dx = np.maximum(np.maximum(self._cell_x - x, x - self._cell_x - self.cell), 0)
+        dy = np.maximum(np.maximum(self._cell_y - y, y - self._cell_y - self.cell), 0)
+        cell_d2 = dx * dx + dy * dy
+        # The k closest buckets hold at least k points, bounding the k-th distance
+        first = np.argpartition(cell_d2, k - 1)[:k] if k < len(cell_d2) else np.arange(len(cell_d2))
+        idx = np.concatenate([self._members[c] for c in first])
+        bound = np.sort(np.hypot(self.x[idx] - x, self.y[idx] - y))[k - 1]
+
+        idx = np.concatenate([self._members[c] for c in np.flatnonzero(cell_d2 <= bound * bound)])
+        dist = np.hypot(self.x[idx] - x, self.y[idx] - y)
+        order = np.argsort(dist, kind="stable")[:k]
+        return idx[order], dist[order]
+
+
+class Location:
+    """Where a request is scored: the locality whose one-hot column is used,
+    the coordinates weather is fetched for (a named locality's own, or the
+    weather grid cell of a coordinate request) and the locality features.
+
+    ``info`` is None for a named locality and otherwise describes how the
+    coordinates were resolved (returned to the client as ``location``).
+    """
+
+    def __init__(self, locality, lat, lon, features, info=None):
+        self.locality = locality
+        self.lat = lat
+        self.lon = lon
+        self.features = features
+        self.info = info
+
+    @property
+    def feature_override(self):
+        # A named locality is scored with its precomputed base row as is
+        return self.features if self.info is not None else None
+
+
+class Locations:
+    """Resolves a request's locality name, or its lat/lon, to a Location."""
+
+    def __init__(self, localities, neighbours=LOCALITY_NEIGHBOURS, max_distance_km=LOCALITY_MAX_DISTANCE_KM):
+        self.localities = localities
+        self.names = localities.names
+        self.neighbours = max(neighbours, 1)
+        self.max_distance_km = max_distance_km
+        self.profiles = localities.features
+        self.index = LocalityIndex(localities.lat, localities.lon)
+
+    def resolve(self, locality=None, lat=None, lon=None):
+        """Location for a locality name or a coordinate; ValueError with the
+        client-facing message if neither resolves."""
+        if locality is not None:
+            i = self.localities.ids.get(locality)
+            if i is None:
+                raise ValueError("Locality not supported")
+            return Location(locality, *self.localities.coords(i),
+                            dict(zip(LOCALITY_FEATURES, self.profiles[i].tolist())))
+        if lat is None or lon is None:
+            raise ValueError("Provide a locality or both lat and lon")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Invalid coordinates: {lat}, {lon}")
+
+        idx, dist = self.index.nearest(lat, lon, self.neighbours)
+        if self.max_distance_km > 0 and dist[0] > self.max_distance_km:
+            raise ValueError(f"No supported locality within {self.max_distance_km:g} km")
+        if len(idx) == 1 or dist[0] < 1e-6:
+            profile = self.profiles[idx[0]]
+        else:
+            weights = 1 / dist ** 2
+            profile = weights @ self.profiles[idx] / weights.sum()
+        features = {f: round(float(v), 3) for f, v in zip(LOCALITY_FEATURES, profile)}
+        nearest = self.names[idx[0]]
+        cell = snap_to_grid(lat, lon)
+        return Location(nearest, *cell, features, {
+            "lat": lat,
+            "lon": lon,
+            "weather_cell": list(cell),
+            "nearest_locality": nearest,
+            "distance_km": round(float(dist[0]), 2),
+            "profile": features,
+        })
@@ -0,0 +1,102 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEATHER_STORE_PATH = os.environ.get("WEATHER_STORE_PATH", os.path.join(ROOT_DIR, "cache", "weather.sqlite"))
+# Archive days younger than this may still be revised upstream, so they are not stored
+ARCHIVE_FINAL_DAYS = int(os.environ.get("WEATHER_ARCHIVE_FINAL_DAYS", 7))
+
+STORE_VARS = ["temperature_2m_mean", "temperature_2m_max", "precipitation_sum"]
+
+
+def date_range(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class WeatherStore:
+    """On-disk (SQLite) store of final daily archive values per coordinate.
+
+    Past daily weather never changes once Open-Meteo has finalised it, so
+    every final day fetched is written here and served locally from then on.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reconnect)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS daily ("
+                " lat REAL NOT NULL, lon REAL NOT NULL, date TEXT NOT NULL,"
+                + "".join(f" {v} REAL NOT NULL," for v in STORE_VARS)
+                + " PRIMARY KEY (lat, lon, date))"
+            )
+        self.days_served = 0
+        self.days_written = 0
+
+    def _reconnect(self):
+        # A SQLite connection must not be used on both sides of a fork; a
+        # forked worker opens its own. The inherited one is kept referenced
+        # rather than closed, so closing it cannot touch the parent's locks.
+        self._inherited = self._conn
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def load(self, lat, lon, start, end):
+        """Stored days in [start, end] as {date: (values in STORE_VARS order)}."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT date, {', '.join(STORE_VARS)} FROM daily"
+                " WHERE lat = ? AND lon = ? AND date BETWEEN ? AND ?",
+                (round(lat, 4), round(lon, 4), start.isoformat(), end.isoformat()),
+            ).fetchall()
+        self.days_served += len(rows)
+        return {date.fromisoformat(r[0]): r[1:] for r in rows}
+
+    def save(self, lat, lon, daily):
+        """Store the final, complete days of an Open-Meteo archive ``daily`` block."""
+        last_final = date.today() - timedelta(days=ARCHIVE_FINAL_DAYS)
+        rows = []
+        for i, day in enumerate(daily["time"]):
+            values = [daily[v][i] for v in STORE_VARS]
+            if date.fromisoformat(day) <= last_final and None not in values:
+                rows.append((round(lat, 4), round(lon, 4), day, *values))
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO daily VALUES ({', '.join('?' * (3 + len(STORE_VARS)))})", rows
+                )
+            self.days_written += len(rows)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            (days,) = self._conn.execute("SELECT COUNT(*) FROM daily").fetchone()
+        return {
+            "path": self.path,
+            "days_stored": days,
+            "days_served": self.days_served,
+            "days_written": self.days_written,
+        }
+
+
+def open_store(path=WEATHER_STORE_PATH):
+    """Open the configured store; None when disabled or not writable (e.g. serverless)."""
+    if not path:
+        return None
+    try:
+        return WeatherStore(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Weather store disabled, cannot open {path}: {e}")
+        return None
@@ -0,0 +1,100 @@
+import asyncio
+import math
+import os
+from datetime import timedelta
+
+import numpy as np
+
+from .inference import HOUSEHOLD_FIELDS, NUMERIC_FEATURES
+from .weather import fetch_last30_days_weather
+
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 50000))
+# Exact SHAP values cost far more per row than a prediction
+SWEEP_MAX_CONTRIB_POINTS = int(os.environ.get("SWEEP_MAX_CONTRIB_POINTS", 1000))
+
+
+def expand_sweep(sweep, contributions=False):
+    """Per-point values of every swept field over their Cartesian product.
+
+    Each field of ``sweep`` maps to a list of values or to
+    ``{"start", "stop", "num"}`` (evenly spaced, both ends included).
+    Raises ValueError for unknown fields or an oversized grid.
+    """
+    if not sweep:
+        raise ValueError("Nothing to sweep")
+    # Sized and checked before anything is allocated: a range's num is
+    # only a number in the request, however large the axis it asks for
+    sizes = {}
+    for field, spec in sweep.items():
+        if field not in HOUSEHOLD_FIELDS:
+            raise ValueError(f"Cannot sweep {field!r}; choose from {', '.join(HOUSEHOLD_FIELDS)}")
+        if isinstance(spec, dict) and spec["num"] < 1:
+            raise ValueError(f"{field}: num must be at least 1")
+        sizes[field] = spec["num"] if isinstance(spec, dict) else len(spec)
+        if sizes[field] == 0:
+            raise ValueError(f"{field}: no values")
+
+    n_points = math.prod(sizes.values())
+    limit = SWEEP_MAX_CONTRIB_POINTS if contributions else SWEEP_MAX_POINTS
+    if n_points > limit:
+        suffix = " with contributions" if contributions else ""
+        raise ValueError(f"Sweep too large{suffix}: {n_points} points (max {limit})")
+    axes = {
+        field: np.linspace(spec["start"], spec["stop"], spec["num"]) if isinstance(spec, dict)
+        else np.asarray(spec, dtype=float)
+        for field, spec in sweep.items()
+    }
+    grids = np.meshgrid(*axes.values(), indexing="ij")
+    return {field: grid.ravel() for field, grid in zip(axes, grids)}
+
+
+async def scenario_sweep(engine, place, household, dt, sweep, contributions=False, approx_contribs=False):
+    """Score ``household`` at ``place`` on ``dt`` over a grid of household values.
+
+    One weather window is fetched and shared by every point; the whole grid
+    is scored in a single booster call, and ``contributions`` adds the
+    per-feature SHAP values for the same feature matrix. The result is
+    columnar: one list per swept field, label and feature, in grid order.
+    """
+    if contributions and not engine.supports_contributions:
+        raise ValueError("Feature contributions need INFERENCE_BACKEND=xgboost")
+    grid = expand_sweep(sweep, contributions)
+    weather = await fetch_last30_days_weather(place.lat, place.lon, dt)
+    result = await asyncio.to_thread(
+        _score_grid, engine, place, household, weather, dt, grid, contributions, approx_contribs
+    )
+    result.update({
+        "forecast_range": {
+            "start": str(dt.date()),
+            "end": str((dt + timedelta(days=6)).date())
+        },
+        "weather_data": weather
+    })
+    if place.info is not None:
+        result["location"] = place.info
+    return result
+
+
+def _score_grid(engine, place, household, weather, dt, grid, contributions, approx_contribs):
+    n_points = len(next(iter(grid.values())))
+    X = engine.build(
+        engine.locality_index[place.locality], {**{f: household[f] for f in HOUSEHOLD_FIELDS}, **grid}, weather,
+        [dt] * n_points, locality_features=place.feature_override,
+    )
+    proba = engine.predict_proba(X)
+    pred_enc = proba.argmax(axis=1)
+    labels = engine.labels
+    result = {
+        "points": n_points,
+        "grid": {f: v.tolist() for f, v in grid.items()},
+        "week_prediction": [labels[i] for i in pred_enc],
+        "probabilities": {label: proba[:, k].tolist() for k, label in enumerate(labels)},
+    }
+    if contributions:
+        # (points, classes, features + bias), reported for each point's predicted class
+        contribs = engine.contributions(X, approx=approx_contribs)[np.arange(n_points), pred_enc]
+        n_cat = len(engine.categories)
+        columns = {"bias": contribs[:, -1], "locality": contribs[:, :n_cat].sum(axis=1)}
+        columns.update((f, contribs[:, n_cat + i]) for i, f in enumerate(NUMERIC_FEATURES))
+        result["contributions"] = {name: np.round(v.astype(float), 6).tolist() for name, v in columns.items()}
+    return result
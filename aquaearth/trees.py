@@ -0,0 +1,187 @@
+import json
+import os
+
+import numpy as np
+
+# "xgboost" scores with the booster itself; "numpy" uses TreeEnsemble below
+# and never imports xgboost at serving time.
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "xgboost")
+BACKENDS = ("xgboost", "numpy")
+# Trees are stored as complete binary trees, 2**depth leaves each
+MAX_DEPTH = 12
+# Rows scored per pass; keeps the (rows x trees) slot arrays in cache
+CHUNK_ROWS = 64
+
+
+def _parse_base_score(value, n_classes):
+    # "0.5" or, for multi-class models from xgboost >= 3, "[1.5E-1,2.8E-1,5.5E-1]"
+    values = [float(v) for v in value.strip("[]").split(",")]
+    return np.resize(np.array(values, dtype=np.float64), n_classes)
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for i in range(len(left)):
+        if left[i] != -1:
+            depth[left[i]] = depth[right[i]] = depth[i] + 1
+    return int(depth.max())
+
+
+def export_trees(booster):
+    """Flatten a multi-class xgboost booster into plain NumPy arrays.
+
+    Each tree is laid out as a complete binary tree of the ensemble's depth
+    (children of node i are 2i+1 and 2i+2), so evaluation needs no child
+    lookups. A leaf shallower than that depth becomes a pass-through split
+    (threshold +inf) whose whole subtree carries its value. Trees are
+    grouped by class; only the rounds up to ``best_iteration`` are kept.
+    """
+    model = json.loads(booster.save_raw("json"))
+    learner = model["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in ("multi:softprob", "multi:softmax"):
+        raise ValueError(f"Unsupported objective for the NumPy backend: {objective}")
+    n_classes = int(learner["learner_model_param"]["num_class"])
+    gbtree = learner["gradient_booster"]["model"]
+    trees, tree_class = gbtree["trees"], gbtree["tree_info"]
+
+    best = booster.attr("best_iteration")
+    if best is not None:
+        keep = int(gbtree["iteration_indptr"][int(best) + 1])
+        trees, tree_class = trees[:keep], tree_class[:keep]
+    if any(any(t["split_type"]) for t in trees):
+        raise ValueError("Categorical splits are not supported by the NumPy backend")
+
+    depth = max(_tree_depth(t["left_children"], t["right_children"]) for t in trees)
+    if depth > MAX_DEPTH:
+        raise ValueError(f"Tree depth {depth} exceeds the NumPy backend limit of {MAX_DEPTH}")
+    n_internal, n_leaves = 2 ** depth - 1, 2 ** depth
+
+    order = np.argsort(tree_class, kind="stable")
+    feature = np.zeros((len(trees), n_internal), dtype=np.int32)
+    threshold = np.full((len(trees), n_internal), np.inf, dtype=np.float32)
+    default_left = np.ones((len(trees), n_internal), dtype=bool)
+    leaf = np.zeros((len(trees), n_leaves), dtype=np.float32)
+    for row, t in enumerate(trees[i] for i in order):
+        left, right = t["left_children"], t["right_children"]
+        stack = [(0, 0, 0)]  # (xgboost node, complete-tree slot, level)
+        while stack:
+            node, slot, level = stack.pop()
+            if left[node] == -1:
+                # Every leaf slot under this node gets the leaf value
+                span = 2 ** (depth - level)
+                first = (slot + 1) * span - 1 - n_internal
+                leaf[row, first:first + span] = t["split_conditions"][node]
+                continue
+            feature[row, slot] = t["split_indices"][node]
+            threshold[row, slot] = t["split_conditions"][node]
+            default_left[row, slot] = bool(t["default_left"][node])
+            stack.append((left[node], 2 * slot + 1, level + 1))
+            stack.append((right[node], 2 * slot + 2, level + 1))
+
+    counts = np.bincount(tree_class, minlength=n_classes)
+    return {
+        "feature": feature,
+        "threshold": threshold,
+        "default_left": default_left,
+        "leaf": leaf,
+        "class_start": np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64),
+        "base_margin": _parse_base_score(learner["learner_model_param"]["base_score"], n_classes),
+        "num_features": np.int64(booster.num_features()),
+    }
+
+
+def save_trees(booster, path):
+    np.savez(path, **export_trees(booster))
+
+
+class TreeEnsemble:
+    """Vectorized evaluator for arrays produced by ``export_trees``.
+
+    Walks every tree for a whole chunk of rows one level at a time, sums
+    the leaf values per class and applies softmax. Mirrors the parts of
+    the xgboost ``Booster`` API that ``InferenceEngine`` uses, so it can
+    stand in for the booster. Margins and softmax are computed in float32
+    in xgboost's order, so results match ``predict_proba`` to within an
+    ulp or so (NumPy's exp is not the C library's).
+    """
+
+    def __init__(self, arrays):
+        self.feature = np.ascontiguousarray(arrays["feature"], dtype=np.intp)
+        self.threshold = np.ascontiguousarray(arrays["threshold"], dtype=np.float32)
+        self.default_left = np.ascontiguousarray(arrays["default_left"], dtype=bool)
+        self.leaf = np.ascontiguousarray(arrays["leaf"], dtype=np.float32)
+        self.class_start = np.asarray(arrays["class_start"], dtype=np.intp)
+        self.base_margin = np.asarray(arrays["base_margin"], dtype=np.float32)
+        self._num_features = int(arrays["num_features"])
+
+        self.n_trees, n_internal = self.feature.shape
+        self.depth = int(np.log2(n_internal + 1))
+        # Trees share few distinct splits, so every row's decision for each
+        # distinct (feature, threshold, default) is computed once per chunk
+        # and nodes only hold an index into those decisions
+        keys = np.rec.fromarrays([self.feature.ravel(), self.threshold.ravel(), self.default_left.ravel()])
+        splits, split_id = np.unique(keys, return_inverse=True)
+        self.split_feature = np.asarray(splits.f0, dtype=np.intp)
+        self.split_threshold = np.asarray(splits.f1, dtype=np.float32)
+        self.split_default_right = ~np.asarray(splits.f2, dtype=bool)
+        self.n_splits = len(splits)
+        self._split_id = split_id.reshape(-1).astype(np.intp)
+        # Offsets turning per-tree slots into indexes of the flat arrays
+        self._node_offset = np.arange(self.n_trees, dtype=np.intp) * n_internal
+        self._leaf_offset = np.arange(self.n_trees, dtype=np.intp) * (n_internal + 1)
+        self._leaf = self.leaf.ravel()
+        self._class_bounds = np.append(self.class_start, self.n_trees).tolist()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(dict(arrays))
+
+    @classmethod
+    def from_booster(cls, booster):
+        return cls(export_trees(booster))
+
+    def num_features(self):
+        return self._num_features
+
+    def attr(self, key):
+        # Early stopping is already applied at export time
+        return None
+
+    def _margin(self, X):
+        n = X.shape[0]
+        x = X[:, self.split_feature]
+        go_right = ~(x < self.split_threshold)
+        missing = np.isnan(x)
+        if missing.any():
+            go_right[missing] = np.broadcast_to(self.split_default_right, x.shape)[missing]
+        go_right = go_right.view(np.uint8).ravel()
+
+        row_offset = (np.arange(n, dtype=np.intp) * self.n_splits)[:, None]
+        slot = np.zeros((n, self.n_trees), dtype=np.intp)
+        for _ in range(self.depth):
+            slot = 2 * slot + 1 + go_right[self._split_id[slot + self._node_offset] + row_offset]
+        values = self._leaf[slot - (2 ** self.depth - 1) + self._leaf_offset]
+        # xgboost adds each class's trees to its base margin one at a time in
+        # float32; cumsum keeps that order where a reduction would not
+        values[:, self.class_start] += self.base_margin
+        margin = np.empty((n, len(self.class_start)), dtype=np.float32)
+        for k, (start, stop) in enumerate(zip(self._class_bounds, self._class_bounds[1:])):
+            margin[:, k] = np.cumsum(values[:, start:stop], axis=1)[:, -1]
+        return margin
+
+    def inplace_predict(self, X, iteration_range=(0, 0), validate_features=False):
+        """Class probabilities, shape (rows, classes), like xgboost's softprob."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self._num_features:
+            raise ValueError(f"Expected rows of {self._num_features} features, got shape {X.shape}")
+        out = np.empty((X.shape[0], len(self.class_start)), dtype=np.float32)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            margin = self._margin(X[start:start + CHUNK_ROWS])
+            margin -= margin.max(axis=1, keepdims=True)
+            np.exp(margin, out=margin)
+            # Like xgboost's Softmax: float32 terms, a double sum
+            margin /= margin.sum(axis=1, keepdims=True, dtype=np.float64).astype(np.float32)
+            out[start:start + CHUNK_ROWS] = margin
+        return out
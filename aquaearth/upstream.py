@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+import httpx
+
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+MAX_CONNECTIONS = int(os.environ.get("OPEN_METEO_MAX_CONNECTIONS", 20))
+MAX_CONCURRENCY = int(os.environ.get("OPEN_METEO_CONCURRENCY", 10))
+ATTEMPT_TIMEOUT = float(os.environ.get("OPEN_METEO_TIMEOUT", 10))
+DEADLINE = float(os.environ.get("OPEN_METEO_DEADLINE", 25))
+RETRIES = int(os.environ.get("OPEN_METEO_RETRIES", 3))
+BREAKER_THRESHOLD = int(os.environ.get("OPEN_METEO_BREAKER_THRESHOLD", 5))
+BREAKER_RESET = float(os.environ.get("OPEN_METEO_BREAKER_RESET", 30))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """Open-Meteo failed after all retries, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker.
+
+    After ``threshold`` failures in a row the breaker opens and calls fail
+    fast for ``reset_timeout`` seconds. Then a single trial call is let
+    through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def end_trial(self):
+        """Free the half-open trial slot of a call that ended without an
+        outcome (cancelled, or an error that is nobody's fault), so the
+        next call can try again instead of the breaker staying shut."""
+        self._trial = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Open-Meteo circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+
+class UpstreamClient:
+    """Shared async HTTP client for Open-Meteo.
+
+    One keep-alive connection pool (HTTP/2 when ``h2`` is installed), a
+    semaphore bounding in-flight upstream requests, full-jitter exponential
+    retries inside a total deadline, and a circuit breaker in front.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_concurrency=MAX_CONCURRENCY,
+                 attempt_timeout=ATTEMPT_TIMEOUT, deadline=DEADLINE, retries=RETRIES):
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.breaker = CircuitBreaker()
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self._client = None
+        self._sem = None
+        self._loop = None
+
+    async def _ensure_client(self):
+        # Pools and semaphores belong to one event loop; rebuild if it changed
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                await self._close_stale(self._client)
+            self._client = httpx.AsyncClient(
+                http2=HTTP2,
+                timeout=self.attempt_timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    async def get_json(self, url, params):
+        trial = self.breaker.state == "half-open"
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("Open-Meteo circuit breaker is open")
+
+        try:
+            with timed("upstream"):
+                return await self._get_json(url, params)
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+    async def _get_json(self, url, params):
+        client = await self._ensure_client()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                async with self._sem:
+                    remaining = max(deadline - loop.time(), 0.1)
+                    r = await client.get(url, params=params, timeout=min(self.attempt_timeout, remaining))
+                if r.status_code in RETRY_STATUS:
+                    raise httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+                r.raise_for_status()
+                data = r.json()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in RETRY_STATUS:
+                    # A 4xx is our request's fault, not an upstream outage
+                    self.breaker.record_success()
+                    raise
+                error = e
+            except (httpx.TransportError, ValueError) as e:
+                # ValueError: a 200 whose body is not JSON (an HTML error
+                # page from a proxy, a truncated reply)
+                error = e
+            else:
+                self.breaker.record_success()
+                return data
+
+            attempt += 1
+            backoff = random.uniform(0, min(4.0, 0.25 * 2 ** attempt))
+            if attempt > self.retries or loop.time() + backoff >= deadline:
+                self.failed += 1
+                self.breaker.record_failure()
+                raise UpstreamUnavailable(f"Open-Meteo request failed after {attempt} attempts: {error!r}")
+            self.retried += 1
+            await asyncio.sleep(backoff)
+
+    @staticmethod
+    async def _close_stale(client):
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Its loop is already closed; its sockets went with it
+            logger.debug(f"Closing the previous event loop's HTTP client failed: {e!r}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        return {
+            "http2": HTTP2,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
@@ -0,0 +1,172 @@
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from .cache import TTLCache
+from .metrics import note_cache, timed
+from .store import STORE_VARS, date_range, open_store
+from .upstream import UpstreamClient, UpstreamUnavailable
+
+# Overridable so load tests can point at a local stand-in (benchmarks/fake_open_meteo.py)
+ARCHIVE_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+ARCHIVE_VARS = ",".join(STORE_VARS)
+FORECAST_VARS = "temperature_2m_max,temperature_2m_min,temperature_2m_mean,precipitation_sum"
+TIMEZONE = "Asia/Kolkata"
+
+# Open-Meteo only refreshes daily series a few times a day, and archive days
+# older than about a week are final, so those can be kept much longer.
+WEATHER_CACHE_TTL = int(os.environ.get("WEATHER_CACHE_TTL", 3600))
+WEATHER_ARCHIVE_FINAL_TTL = int(os.environ.get("WEATHER_ARCHIVE_FINAL_TTL", 86400))
+WEATHER_CACHE_SIZE = int(os.environ.get("WEATHER_CACHE_SIZE", 512))
+# Serve archive windows from the local store only, never calling Open-Meteo
+WEATHER_OFFLINE = os.environ.get("WEATHER_OFFLINE", "0") == "1"
+# Coordinates per multi-point forecast request, keeping its URL a few KB long
+FORECAST_BATCH_COORDS = int(os.environ.get("FORECAST_BATCH_COORDS", 100))
+
+weather_cache = TTLCache(maxsize=WEATHER_CACHE_SIZE, ttl=WEATHER_CACHE_TTL, name="weather")
+upstream = UpstreamClient()
+weather_store = open_store()
+
+
+async def _get_daily(url, params):
+    return (await upstream.get_json(url, params))["daily"]
+
+
+async def _fetch_archive_span(lat, lon, start, end):
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "daily": ARCHIVE_VARS,
+        "timezone": TIMEZONE
+    }
+    key = ("archive", round(lat, 4), round(lon, 4), params["start_date"], params["end_date"], ARCHIVE_VARS)
+    final = end <= datetime.now().date() - timedelta(days=7)
+    ttl = WEATHER_ARCHIVE_FINAL_TTL if final else None
+    return await weather_cache.get_or_load(key, lambda: _get_daily(ARCHIVE_URL, params), ttl=ttl)
+
+
+async def fetch_archive_daily(lat, lon, start_date, end_date):
+    """Archive daily series for [start_date, end_date].
+
+    Days already in the local weather store are served from disk; only the
+    span covering the missing days is requested upstream, and its final
+    days are written back. In offline mode a missing day is an error.
+    """
+    start = start_date.date() if isinstance(start_date, datetime) else start_date
+    end = end_date.date() if isinstance(end_date, datetime) else end_date
+    days = date_range(start, end)
+    stored = weather_store.load(lat, lon, start, end) if weather_store is not None else {}
+    missing = [d for d in days if d not in stored]
+    if weather_store is not None:
+        note_cache("weather_store", "miss" if missing else "hit")
+
+    if missing:
+        if WEATHER_OFFLINE:
+            raise UpstreamUnavailable(f"Offline mode: {len(missing)} of {len(days)} days not in the weather store")
+        fetched = await _fetch_archive_span(lat, lon, missing[0], missing[-1])
+        if weather_store is not None:
+            weather_store.save(lat, lon, fetched)
+        for i, day in enumerate(fetched["time"]):
+            d = date.fromisoformat(day)
+            if d not in stored:
+                stored[d] = tuple(fetched[v][i] for v in STORE_VARS)
+
+    daily = {"time": [d.isoformat() for d in days]}
+    for j, v in enumerate(STORE_VARS):
+        daily[v] = [stored[d][j] for d in days]
+    return daily
+
+
+async def fetch_forecast_weather(lat, lon, past_days=31, forecast_days=7):
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "daily": FORECAST_VARS,
+        "timezone": TIMEZONE,
+        "past_days": past_days,
+        "forecast_days": forecast_days
+    }
+    return await weather_cache.get_or_load(
+        _forecast_key(lat, lon, past_days, forecast_days), lambda: _get_daily(FORECAST_URL, params)
+    )
+
+
+def _forecast_key(lat, lon, past_days, forecast_days):
+    return ("forecast", round(lat, 4), round(lon, 4), past_days, forecast_days, FORECAST_VARS)
+
+
+async def fetch_forecast_weather_many(coords, past_days=31, forecast_days=7, refresh=False):
+    """Forecast daily series for many (lat, lon) points.
+
+    Points missing from the cache (all of them with ``refresh=True``) are
+    fetched in batches of FORECAST_BATCH_COORDS per upstream request
+    (Open-Meteo accepts comma-separated coordinate lists), the batches
+    running concurrently, and then cached individually, so later
+    single-point lookups hit. Repeated points are requested once.
+    """
+    keys = [_forecast_key(lat, lon, past_days, forecast_days) for lat, lon in coords]
+    first = {}
+    for i, key in enumerate(keys):
+        first.setdefault(key, i)
+    if refresh:
+        missing = list(first.values())
+    else:
+        missing = [i for key, i in first.items() if weather_cache.peek(key) is None]
+
+    async def load(batch):
+        params = {
+            "latitude": ",".join(str(coords[i][0]) for i in batch),
+            "longitude": ",".join(str(coords[i][1]) for i in batch),
+            "daily": FORECAST_VARS,
+            "timezone": TIMEZONE,
+            "past_days": past_days,
+            "forecast_days": forecast_days
+        }
+        data = await upstream.get_json(FORECAST_URL, params)
+        # A single coordinate comes back as an object, several as a list
+        data = data if isinstance(data, list) else [data]
+        for i, d in zip(batch, data):
+            weather_cache.put(keys[i], d["daily"])
+        return len(data)
+
+    async def load_batch(batch):
+        if refresh:
+            return await load(batch)
+        multi_key = ("forecast_multi",) + tuple(keys[i] for i in batch)
+        return await weather_cache.get_or_load(multi_key, lambda: load(batch))
+
+    batches = [missing[i:i + FORECAST_BATCH_COORDS] for i in range(0, len(missing), FORECAST_BATCH_COORDS)]
+    await asyncio.gather(*(load_batch(batch) for batch in batches))
+
+    # Anything evicted in the meantime falls back to a single-point fetch
+    return await asyncio.gather(*(fetch_forecast_weather(lat, lon, past_days, forecast_days) for lat, lon in coords))
+
+
+async def fetch_last30_days_weather(lat, lon, end_date):
+    with timed("weather"):
+        daily = await fetch_archive_daily(lat, lon, end_date - timedelta(days=29), end_date)
+    temp_mean = np.array(daily["temperature_2m_mean"], dtype=float)
+    temp_max = np.array(daily["temperature_2m_max"], dtype=float)
+    rain = np.array(daily["precipitation_sum"], dtype=float)
+    return {
+        "rainfall_30d_mm": round(float(rain.sum()), 1),
+        "rainfall_last7d_mm": round(float(rain[-7:].sum()), 1),
+        "temperature_avg_c": round(float(temp_mean.mean()), 1),
+        "temperature_std_c": round(float(temp_mean.std()), 1),
+        "heatwave_days_30d": int((temp_max > 35).sum()),
+        "dry_spell_days_30d": int((rain < 1.0).sum())
+    }
+
+
+def weather_stats():
+    return {
+        "weather": weather_cache.stats(),
+        "upstream": upstream.stats(),
+        "store": weather_store.stats() if weather_store is not None else None,
+        "offline": WEATHER_OFFLINE,
+    }
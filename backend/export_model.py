@@ -0,0 +1,26 @@
+import argparse
+import os
+import sys
+
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from aquaearth.artifacts import save_artifact
+
+def export(pipeline_path, encoder_path, out_dir):
+    # Convert the training pickles into the compact serving artifact used by api/index.py
+    pipeline = joblib.load(pipeline_path)
+    le = joblib.load(encoder_path)
+    categories = pipeline.named_steps["prep"].named_transformers_["cat"].categories_[0]
+    booster = pipeline.named_steps["xgb"].get_booster()
+    model_path, meta_path = save_artifact(booster, categories, le.classes_, out_dir)
+    print(f"✅ Exported {model_path} and {meta_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the trained model as UBJSON, NumPy trees + JSON metadata")
+    parser.add_argument("--pipeline", default=os.path.join(BASE_DIR, "models", "water_week_xgb_model.pkl"))
+    parser.add_argument("--encoder", default=os.path.join(BASE_DIR, "models", "week_label_encoder.pkl"))
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(BASE_DIR), "api", "models"))
+    args = parser.parse_args()
+    export(args.pipeline, args.encoder, args.out)
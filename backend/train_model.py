@@ -1,79 +1,372 @@
-import pandas as pd
+"""Train the weekly shortage-risk model.
+
+    python train_model.py data.csv                      # one fit, default params
+    python train_model.py data.parquet --search 24 --workers 4 --nthread 8
+    python train_model.py big.csv --chunksize 500000 --export-api
+    python train_model.py new_rows.csv --resume --n-estimators 100 --publish
+
+CSV input is read in chunks with compact dtypes; Parquet input (needs
+pyarrow) is read column-wise. Trees are grown with ``tree_method="hist"``
+and early-stopped on the held-out split. ``--search`` runs random
+hyperparameter trials in a process pool and picks the lowest validation
+mlogloss; every trial's wall time, peak memory and mlogloss go to the
+JSON report.
+
+``--resume`` continues boosting the model in ``--out`` on newly appended
+data, keeping its encoders and parameters; when the result is saved over
+the base model, the base pickles are kept as ``*.prev``. ``--publish`` adds the result
+as a new version of a versioned model directory, which running servers
+pick up without a restart.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
 import joblib
+import numpy as np
+import pandas as pd
 from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, OneHotEncoder
 from sklearn.compose import ColumnTransformer
+from sklearn.metrics import accuracy_score, log_loss
 from sklearn.pipeline import Pipeline
-import os
 
-def train():
-    # Load dataset
-    data_path = r"C:\Users\AdithyaP\Downloads\water_shortage_week_forecast_dataset_5000_advanced.csv"
-    if not os.path.exists(data_path):
-        print(f"Error: Dataset not found at {data_path}")
-        return
-
-    df = pd.read_csv(data_path)
-    
-    # Preprocessing
-    df["prediction_date"] = pd.to_datetime(df["prediction_date"], dayfirst=True)
-    df["day"] = df["prediction_date"].dt.day
-    df["month"] = df["prediction_date"].dt.month
-    df["weekday"] = df["prediction_date"].dt.weekday
-    df = df.drop(columns=["prediction_date"])
-
-    target = "shortage_risk_week"
-    X = df.drop(columns=[target])
-    y = df[target]
-
-    # Encode target
-    le = LabelEncoder()
-    y_enc = le.fit_transform(y)
-    
-    # Split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y_enc, test_size=0.2, random_state=42, stratify=y_enc
-    )
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from aquaearth.artifacts import publish_artifact, save_artifact
+from aquaearth.inference import NUMERIC_FEATURES
+
+PIPELINE_FILE = "water_week_xgb_model.pkl"
+ENCODER_FILE = "week_label_encoder.pkl"
+TARGET = "shortage_risk_week"
+DATE_COLUMN = "prediction_date"
+# Compact dtypes for the dataset columns; day/month/weekday are derived from the date
+DTYPES = {
+    "locality": "category",
+    "household_size": "int8",
+    "usage_per_person_lpd": "float32",
+    "rainfall_30d_mm": "float32",
+    "rainfall_last7d_mm": "float32",
+    "temperature_avg_c": "float32",
+    "temperature_std_c": "float32",
+    "heatwave_days_30d": "int8",
+    "dry_spell_days_30d": "int8",
+    "population_density_score": "int8",
+    "construction_index": "int8",
+    "tanker_cost_index": "int8",
+    "avg_demand_liters": "float32",
+    "avg_supply_liters": "float32",
+    "avg_supply_demand_ratio": "float32",
+    "avg_supply_hours": "float32",
+    "tanker_trips_30d": "int8",
+    "tanker_days_30d": "int8",
+    TARGET: "category",
+}
+COLUMNS = [DATE_COLUMN, *DTYPES]
+
+DEFAULT_PARAMS = {
+    "n_estimators": 500,
+    "learning_rate": 0.05,
+    "max_depth": 6,
+    "subsample": 0.9,
+    "colsample_bytree": 0.9,
+    "min_child_weight": 1,
+    "reg_lambda": 1.0,
+}
+SEARCH_SPACE = {
+    "learning_rate": [0.03, 0.05, 0.1],
+    "max_depth": [4, 5, 6, 8],
+    "subsample": [0.7, 0.8, 0.9, 1.0],
+    "colsample_bytree": [0.7, 0.8, 0.9, 1.0],
+    "min_child_weight": [1, 3, 5],
+    "reg_lambda": [0.5, 1.0, 2.0, 5.0],
+}
 
-    # Features
-    cat_cols = ["locality"]
-    num_cols = [c for c in X.columns if c not in cat_cols]
 
-    preprocessor = ColumnTransformer(
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        mem = psutil.Process().memory_info()
+        return round(getattr(mem, "peak_wset", mem.rss) / 2**20, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss counts bytes on macOS and kilobytes on Linux
+    return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+
+def _add_date_features(df):
+    dates = pd.to_datetime(df.pop(DATE_COLUMN), dayfirst=True)
+    df["day"] = dates.dt.day.astype("int8")
+    df["month"] = dates.dt.month.astype("int8")
+    df["weekday"] = dates.dt.weekday.astype("int8")
+    return df
+
+
+def _csv_layout(path, chunksize):
+    """Row count and sorted category set of each categorical column, from a
+    pass over just those columns."""
+    n_rows = 0
+    seen = {col: set() for col, dtype in DTYPES.items() if dtype == "category"}
+    for chunk in pd.read_csv(path, usecols=list(seen), dtype="category", chunksize=chunksize):
+        n_rows += len(chunk)
+        for col, values in seen.items():
+            values.update(chunk[col].cat.categories)
+    return n_rows, {col: pd.CategoricalDtype(sorted(values)) for col, values in seen.items()}
+
+
+def load_dataset(path, chunksize=None):
+    """Read the dataset with compact dtypes, one chunk at a time for CSV."""
+    if path.endswith((".parquet", ".pq")):
+        return _add_date_features(pd.read_parquet(path, columns=COLUMNS).astype(DTYPES))
+
+    # Holding every chunk and concatenating them needs twice the dataset at
+    # the peak. Instead the frame is sized by a first pass over the
+    # categorical columns, then filled one chunk at a time
+    chunksize = chunksize or 200_000
+    n_rows, categoricals = _csv_layout(path, chunksize)
+    dtypes = dict(DTYPES, **categoricals)
+    columns = {}
+    start = 0
+    for chunk in pd.read_csv(path, usecols=COLUMNS, dtype=dtypes, chunksize=chunksize):
+        chunk = _add_date_features(chunk)
+        end = start + len(chunk)
+        for col, values in chunk.items():
+            # Categoricals are filled as codes against the full category set
+            values = values.cat.codes if col in categoricals else values
+            if col not in columns:
+                columns[col] = np.empty(n_rows, dtype=values.dtype)
+            columns[col][start:end] = values.to_numpy()
+        start = end
+    for col, dtype in categoricals.items():
+        columns[col] = pd.Categorical.from_codes(columns[col], dtype=dtype)
+    # copy=False keeps the filled arrays as the frame's columns
+    return pd.DataFrame(columns, copy=False)
+
+
+def make_preprocessor():
+    # float32 one-hot keeps the transformed matrix dense float32 instead of float64
+    return ColumnTransformer(
         transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-            ("num", "passthrough", num_cols)
+            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False, dtype=np.float32), ["locality"]),
+            ("num", "passthrough", NUMERIC_FEATURES),
         ]
     )
 
-    # Model
-    clf = XGBClassifier(
-        n_estimators=500,
-        learning_rate=0.05,
-        max_depth=6,
-        subsample=0.9,
-        colsample_bytree=0.9,
-        reg_lambda=1.0,
-        random_state=42,
-        eval_metric="mlogloss"
+
+def make_classifier(params, nthread, early_stopping_rounds, seed):
+    return XGBClassifier(
+        **params,
+        tree_method="hist",
+        n_jobs=nthread,
+        early_stopping_rounds=early_stopping_rounds,
+        random_state=seed,
+        eval_metric="mlogloss",
+    )
+
+
+def fit(params, X_train, y_train, X_valid, y_valid, nthread, early_stopping_rounds, seed, xgb_model=None):
+    clf = make_classifier(params, nthread, early_stopping_rounds, seed)
+    clf.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False, xgb_model=xgb_model)
+    return clf, min(clf.evals_result()["validation_0"]["mlogloss"])
+
+
+def _run_trial(trial):
+    # Runs in a fresh worker process per trial, so the peak RSS is this trial's
+    data = {name: np.load(os.path.join(trial["data_dir"], f"{name}.npy"), mmap_mode="r")
+            for name in ("X_train", "y_train", "X_valid", "y_valid")}
+    t0 = time.perf_counter()
+    clf, mlogloss = fit(
+        trial["params"], data["X_train"], data["y_train"], data["X_valid"], data["y_valid"],
+        trial["nthread"], trial["early_stopping_rounds"], trial["seed"],
+    )
+    return {
+        "trial": trial["trial"],
+        "params": trial["params"],
+        "best_iteration": int(clf.best_iteration),
+        "val_mlogloss": round(float(mlogloss), 6),
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def sample_params(n_trials, seed):
+    """The default parameters first, then random draws from SEARCH_SPACE."""
+    rng = random.Random(seed)
+    trials = [dict(DEFAULT_PARAMS)]
+    while len(trials) < n_trials:
+        trials.append({**DEFAULT_PARAMS, **{k: rng.choice(v) for k, v in SEARCH_SPACE.items()}})
+    return trials
+
+
+def search(X_train, y_train, X_valid, y_valid, args):
+    """Run ``args.search`` trials across ``args.workers`` processes."""
+    nthread = max(1, args.nthread // args.workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Workers memory-map the transformed matrices instead of unpickling copies
+        for name, array in (("X_train", X_train), ("y_train", y_train), ("X_valid", X_valid), ("y_valid", y_valid)):
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        trials = [
+            {"trial": i, "params": dict(p, n_estimators=args.n_estimators), "data_dir": tmp, "nthread": nthread,
+             "early_stopping_rounds": args.early_stopping_rounds, "seed": args.seed}
+            for i, p in enumerate(sample_params(args.search, args.seed))
+        ]
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=get_context("spawn"),
+                                 max_tasks_per_child=1) as pool:
+            results = []
+            for r in pool.map(_run_trial, trials):
+                rss = "-" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+                print(f"  trial {r['trial']:>3}  mlogloss {r['val_mlogloss']:.5f}  "
+                      f"iters {r['best_iteration'] + 1:>4}  {r['wall_s']:>7.1f}s  {rss:>7} MB")
+                results.append(r)
+    return results
+
+
+def train(args):
+    t_start = time.perf_counter()
+    print(f"Loading {args.data}...")
+    df = load_dataset(args.data, args.chunksize)
+    y = df.pop(TARGET)
+    print(f"  {len(df):,} rows, {df.memory_usage(deep=True).sum() / 2**20:.1f} MB in memory")
+
+    base = None
+    if args.resume is not None:
+        # Continue from the existing model: its encoders stay fixed so the
+        # feature layout and label order do not change under the servers
+        resume_dir = args.resume or args.out
+        base = joblib.load(os.path.join(resume_dir, PIPELINE_FILE))
+        le = joblib.load(os.path.join(resume_dir, ENCODER_FILE))
+        y_enc = le.transform(y).astype(np.int32)
+        known = base.named_steps["prep"].named_transformers_["cat"].categories_[0]
+        unknown = int((~df["locality"].isin(known)).sum())
+        if unknown:
+            print(f"  ⚠️ {unknown:,} rows have localities the base model has no column for")
+    else:
+        # Encode target
+        le = LabelEncoder()
+        y_enc = le.fit_transform(y).astype(np.int32)
+
+    # Split
+    X_train, X_valid, y_train, y_valid = train_test_split(
+        df, y_enc, test_size=args.test_size, random_state=args.seed, stratify=y_enc
     )
+    del df, y
+
+    preprocessor = base.named_steps["prep"] if base is not None else make_preprocessor().fit(X_train)
+    Xt_train = preprocessor.transform(X_train)
+    Xt_valid = preprocessor.transform(X_valid)
+    del X_train, X_valid
+
+    report = {
+        "data": args.data,
+        "rows_train": int(len(y_train)),
+        "rows_valid": int(len(y_valid)),
+        "nthread": args.nthread,
+    }
+    params = dict(DEFAULT_PARAMS, n_estimators=args.n_estimators)
+    xgb_model = None
+    if base is not None:
+        base_clf = base.named_steps["xgb"]
+        params = {k: base_clf.get_params()[k] for k in DEFAULT_PARAMS}
+        params["n_estimators"] = args.n_estimators
+        booster = base_clf.get_booster()
+        # Continue from the early-stopped model, not the rounds boosted past it
+        best = booster.attr("best_iteration")
+        rounds = int(best) + 1 if best is not None else booster.num_boosted_rounds()
+        xgb_model = booster[:rounds]
+        report["resumed_from"] = {"dir": args.resume or args.out, "rounds": rounds}
+    if args.search:
+        print(f"Searching {args.search} trials on {args.workers} workers...")
+        t0 = time.perf_counter()
+        trials = search(Xt_train, y_train, Xt_valid, y_valid, args)
+        best = min(trials, key=lambda r: r["val_mlogloss"])
+        params = dict(best["params"], n_estimators=args.n_estimators)
+        report["search"] = {"wall_s": round(time.perf_counter() - t0, 3), "workers": args.workers,
+                            "best_trial": best["trial"], "trials": trials}
+
+    # Model
+    print(f"Training model ({params})...")
+    t0 = time.perf_counter()
+    clf, _ = fit(params, Xt_train, y_train, Xt_valid, y_valid,
+                 args.nthread, args.early_stopping_rounds, args.seed, xgb_model)
+    proba = clf.predict_proba(Xt_valid)
+    report["final"] = {
+        "params": params,
+        "best_iteration": int(clf.best_iteration),
+        "num_boosted_rounds": clf.get_booster().num_boosted_rounds(),
+        "val_mlogloss": round(float(log_loss(y_valid, proba)), 6),
+        "val_accuracy": round(float(accuracy_score(y_valid, proba.argmax(axis=1))), 6),
+        "wall_s": round(time.perf_counter() - t0, 3),
+    }
+    print(f"  best iteration {clf.best_iteration}, validation mlogloss {report['final']['val_mlogloss']:.5f}, "
+          f"accuracy {report['final']['val_accuracy']:.4f}")
 
     model = Pipeline(steps=[
         ("prep", preprocessor),
         ("xgb", clf)
     ])
 
-    # Fit
-    print("Training model...")
-    model.fit(X_train, y_train)
-    
     # Save artifacts
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(model, "models/water_week_xgb_model.pkl")
-    joblib.dump(le, "models/week_label_encoder.pkl")
-    
-    print("✅ Model trained and saved to models/ folder")
+    os.makedirs(args.out, exist_ok=True)
+    if base is not None and os.path.samefile(args.resume or args.out, args.out):
+        # Resumed in place: the base model is moved aside, not lost
+        for name in (PIPELINE_FILE, ENCODER_FILE):
+            os.replace(os.path.join(args.out, name), os.path.join(args.out, name + ".prev"))
+        print(f"  ⚠️ replacing the base model in {args.out}; its pickles are kept as *.prev")
+    joblib.dump(model, os.path.join(args.out, PIPELINE_FILE))
+    joblib.dump(le, os.path.join(args.out, ENCODER_FILE))
+    categories = preprocessor.named_transformers_["cat"].categories_[0]
+    if args.export_api:
+        save_artifact(clf.get_booster(), categories, le.classes_, args.export_api)
+    if args.publish:
+        report["published_version"] = publish_artifact(clf.get_booster(), categories, le.classes_, args.publish)
+        print(f"  published version {report['published_version']} to {args.publish}")
+
+    report["wall_s"] = round(time.perf_counter() - t_start, 3)
+    report["peak_rss_mb"] = peak_rss_mb()
+    report_path = args.report or os.path.join(args.out, "train_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✅ Model trained and saved to {args.out} (report: {report_path})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the weekly water shortage risk model")
+    parser.add_argument("data", help="dataset (.csv, or .parquet with pyarrow installed)")
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "models"), help="directory for the pickles")
+    parser.add_argument("--export-api", nargs="?", const=os.path.join(os.path.dirname(BASE_DIR), "api", "models"),
+                        help="also write the serving artifact (default dir: api/models)")
+    parser.add_argument("--publish", nargs="?", const=os.path.join(BASE_DIR, "models", "registry"),
+                        help="also publish as a new version of a versioned model dir (default: backend/models/registry)")
+    parser.add_argument("--resume", nargs="?", const="",
+                        help="continue boosting the model saved in this dir (default: --out) on the new data")
+    parser.add_argument("--report", help="JSON report path (default: <out>/train_report.json)")
+    parser.add_argument("--chunksize", type=int, help="CSV rows per chunk (default 200000)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--n-estimators", type=int, default=DEFAULT_PARAMS["n_estimators"],
+                        help="maximum boosting rounds (rounds to add with --resume)")
+    parser.add_argument("--early-stopping-rounds", type=int, default=50)
+    parser.add_argument("--nthread", type=int, default=os.cpu_count(), help="total training threads")
+    parser.add_argument("--search", type=int, default=0, help="number of hyperparameter trials (0: no search)")
+    parser.add_argument("--workers", type=int, default=2, help="parallel trial processes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.resume is not None and args.search:
+        parser.error("--search cannot be combined with --resume")
+    return args
+
 
 if __name__ == "__main__":
-    train()
+    train(parse_args())
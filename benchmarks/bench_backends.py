@@ -0,0 +1,116 @@
+"""Inference backends: xgboost booster vs the NumPy tree evaluator.
+
+Scores random feature rows laid out like the serving model (one-hot
+locality + numeric features) at batch sizes 1, 7 (one /forecast_7day),
+21 and 10,000. Each backend runs in its own interpreter so peak RSS covers
+only that backend's import, model load and scoring. Run from the
+repository root:
+
+    python benchmarks/bench_backends.py [--repeat 200] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, "api", "models")
+BATCH_SIZES = [1, 7, 21, 10000]
+
+CHILD = r"""
+import json, resource, sys, time
+import numpy as np
+
+def rss_mb():
+    # ru_maxrss counts bytes on macOS and kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 1024)
+
+backend, model_dir, repeat = sys.argv[1], sys.argv[2], int(sys.argv[3])
+sizes = [int(n) for n in sys.argv[4].split(",")]
+rss_start = rss_mb()
+t0 = time.perf_counter()
+if backend == "numpy":
+    from aquaearth.trees import TreeEnsemble
+    model = TreeEnsemble.load(model_dir + "/model_trees.npz")
+else:
+    import xgboost as xgb
+    model = xgb.Booster()
+    model.load_model(model_dir + "/model.ubj")
+load_ms = (time.perf_counter() - t0) * 1000
+rss_loaded = rss_mb()
+
+rng = np.random.default_rng(0)
+n_features = model.num_features()
+def rows(n):
+    X = np.zeros((n, n_features), dtype=np.float32)
+    X[np.arange(n), rng.integers(0, 22, n)] = 1
+    X[:, 22:] = rng.random((n, n_features - 22)) * 100
+    return X
+
+out = {"backend": backend, "load_ms": round(load_ms, 1), "rss_loaded_mb": round(rss_loaded - rss_start, 1), "batches": {}}
+for n in sizes:
+    X = rows(n)
+    reps = max(3, repeat if n < 1000 else repeat // 50)
+    for _ in range(min(10, reps)):
+        model.inplace_predict(X)
+    times = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        model.inplace_predict(X)
+        times.append(time.perf_counter() - t0)
+    ms = sorted(times)[len(times) // 2] * 1000
+    out["batches"][n] = {"ms": round(ms, 3), "us_per_row": round(ms * 1000 / n, 2)}
+out["rss_peak_mb"] = round(rss_mb() - rss_start, 1)
+print(json.dumps(out))
+"""
+
+
+def run(backend, repeat):
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, backend, MODEL_DIR, str(repeat), ",".join(map(str, BATCH_SIZES))],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def check_agreement():
+    import numpy as np
+    import xgboost as xgb
+    sys.path.insert(0, ROOT)
+    from aquaearth.trees import TreeEnsemble
+
+    booster = xgb.Booster()
+    booster.load_model(os.path.join(MODEL_DIR, "model.ubj"))
+    ensemble = TreeEnsemble.load(os.path.join(MODEL_DIR, "model_trees.npz"))
+    rng = np.random.default_rng(1)
+    X = np.zeros((2000, booster.num_features()), dtype=np.float32)
+    X[np.arange(2000), rng.integers(0, 22, 2000)] = 1
+    X[:, 22:] = rng.random((2000, X.shape[1] - 22)) * 100
+    return float(np.abs(booster.inplace_predict(X) - ensemble.inplace_predict(X)).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per small batch size")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [run(backend, args.repeat) for backend in ("xgboost", "numpy")]
+    max_diff = check_agreement()
+    if args.json:
+        print(json.dumps({"results": results, "max_abs_diff": max_diff}, indent=2))
+        return
+
+    print(f"{'backend':<10}{'load ms':>10}{'RSS load MB':>13}{'RSS peak MB':>13}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['load_ms']:>10.1f}{r['rss_loaded_mb']:>13.1f}{r['rss_peak_mb']:>13.1f}")
+    print()
+    print(f"{'batch':>7}" + "".join(f"{r['backend'] + ' ms':>14}" for r in results))
+    for n in BATCH_SIZES:
+        print(f"{n:>7}" + "".join(f"{r['batches'][str(n)]['ms']:>14.3f}" for r in results))
+    print(f"\nmax |p_xgboost - p_numpy| = {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Forecast latency vs horizon: block build and scoring for 1 to 16 days.
+
+A block is built once per refresh for the longest horizon; each request
+then scores its ``days`` rows in one booster call. Run from the
+repository root:
+
+    python benchmarks/bench_horizon.py [--n 500]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from datetime import date, timedelta
+
+import joblib
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from aquaearth.forecast import FORECAST_MAX_DAYS, FORECAST_PAST_DAYS, ForecastBlock, score_blocks
+from aquaearth.inference import InferenceEngine
+from aquaearth.localities import LocalityTable
+
+warnings.filterwarnings("ignore")
+
+LOCALITIES = LocalityTable.load()
+HOUSEHOLD = {
+    "household_size": 4, "usage_per_person_lpd": 135.0, "avg_demand_liters": 540,
+    "avg_supply_liters": 400, "avg_supply_hours": 3.0, "tanker_trips_30d": 2, "tanker_days_30d": 2,
+}
+
+
+def daily_series(forecast_days, seed=0):
+    rng = np.random.default_rng(seed)
+    n = FORECAST_PAST_DAYS + forecast_days
+    start = date.today() - timedelta(days=FORECAST_PAST_DAYS)
+    temp = np.round(rng.normal(26, 2.5, n), 1)
+    return {
+        "time": [(start + timedelta(days=i)).isoformat() for i in range(n)],
+        "temperature_2m_mean": temp.tolist(),
+        "temperature_2m_max": np.round(temp + rng.normal(6, 2, n), 1).tolist(),
+        "precipitation_sum": np.round(rng.gamma(0.6, 6, n) * (rng.random(n) < 0.5), 1).tolist(),
+    }
+
+
+def timeit(fn, n):
+    for _ in range(min(20, n)):
+        fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=500, help="repetitions per horizon")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(os.path.join(ROOT, "backend", "models", "water_week_xgb_model.pkl"))
+    le = joblib.load(os.path.join(ROOT, "backend", "models", "week_label_encoder.pkl"))
+    engine = InferenceEngine.from_pipeline(pipeline, le, LOCALITIES)
+    locality = LOCALITIES.names[0]
+
+    print(f"{'days':>5}{'block build us':>16}{'score us':>12}")
+    for days in (1, 3, 7, 10, 14, FORECAST_MAX_DAYS):
+        daily = daily_series(days)
+        block = ForecastBlock(daily)
+        build_us = timeit(lambda: ForecastBlock(daily), args.n)
+        score_us = timeit(lambda: score_blocks(engine, [locality], HOUSEHOLD, [block], days=days), args.n)
+        print(f"{days:>5}{build_us:>16.0f}{score_us:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Per-prediction latency: old per-request feature building vs InferenceEngine.
+
+Run from the repository root:
+
+    python benchmarks/bench_inference.py [--n 2000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from aquaearth.inference import InferenceEngine, NUMERIC_FEATURES
+from aquaearth.localities import LocalityTable
+
+warnings.filterwarnings("ignore")
+
+LOCALITY = {"Whitefield": {"population_density_score": 9, "construction_index": 9, "tanker_cost_index": 9}}
+LOCALITIES = LocalityTable.from_rows([("Whitefield", 12.9698, 77.75, 9, 9, 9)])
+HOUSEHOLD = {
+    "household_size": 4, "usage_per_person_lpd": 135.0, "avg_demand_liters": 540,
+    "avg_supply_liters": 400, "avg_supply_hours": 3.0, "tanker_trips_30d": 2, "tanker_days_30d": 2,
+}
+WEATHER = {
+    "rainfall_30d_mm": 84.2, "rainfall_last7d_mm": 12.5, "temperature_avg_c": 27.3,
+    "temperature_std_c": 1.8, "heatwave_days_30d": 3, "dry_spell_days_30d": 17,
+}
+DT = datetime(2025, 6, 1)
+
+
+def feature_dict():
+    ratio = HOUSEHOLD["avg_supply_liters"] / max(HOUSEHOLD["avg_demand_liters"], 1)
+    return {
+        "locality": "Whitefield", **HOUSEHOLD, **WEATHER, **LOCALITY["Whitefield"],
+        "avg_supply_demand_ratio": round(float(ratio), 3),
+        "day": DT.day, "month": DT.month, "weekday": DT.weekday(),
+    }
+
+
+def old_pipeline(pipeline, le):
+    X_input = pd.DataFrame([feature_dict()])
+    pred_enc = pipeline.predict(X_input)[0]
+    le.inverse_transform([pred_enc])[0]
+    pipeline.predict_proba(X_input)[0]
+
+
+def old_classifier(clf, categories):
+    X = feature_dict()
+    oh = [1.0 if c == X["locality"] else 0.0 for c in categories]
+    X_input = np.array(oh + [X[f] for f in NUMERIC_FEATURES]).reshape(1, -1)
+    clf.predict(X_input)[0]
+    clf.predict_proba(X_input)[0]
+
+
+def timeit(fn, n):
+    for _ in range(min(50, n)):
+        fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=2000, help="predictions per variant")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(os.path.join(ROOT, "backend", "models", "water_week_xgb_model.pkl"))
+    le = joblib.load(os.path.join(ROOT, "backend", "models", "week_label_encoder.pkl"))
+    clf = pipeline.named_steps["xgb"]
+    categories = list(pipeline.named_steps["prep"].named_transformers_["cat"].categories_[0])
+    engine = InferenceEngine.from_pipeline(pipeline, le, LOCALITIES)
+
+    variants = [
+        ("backend: DataFrame + Pipeline (predict + predict_proba)", lambda: old_pipeline(pipeline, le)),
+        ("api: lists + one-hot scan (predict + predict_proba)", lambda: old_classifier(clf, categories)),
+        ("InferenceEngine.predict_one", lambda: engine.predict_one("Whitefield", HOUSEHOLD, WEATHER, DT)),
+    ]
+    print(f"{'variant':<58}{'us/prediction':>14}")
+    for name, fn in variants:
+        print(f"{name:<58}{timeit(fn, args.n):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
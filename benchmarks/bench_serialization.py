@@ -0,0 +1,113 @@
+"""Serialization CPU and payload size of large multi-row responses, per format.
+
+Builds a /backtest-shaped result (prediction, per-label probabilities,
+forecast range and weather features per row) and times turning it into
+response bytes: the old per-row dicts through FastAPI's jsonable_encoder
+and the stdlib json, then the Table formats with and without orjson.
+Run from the repository root:
+
+    python benchmarks/bench_serialization.py [--rows 10000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from aquaearth import encoding
+from aquaearth.encoding import Table
+from aquaearth.inference import WEATHER_FEATURES
+
+LABELS = ["High", "Low", "Medium"]
+
+
+def make_result(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    proba = rng.dirichlet(np.ones(len(LABELS)), n_rows).astype(np.float32)
+    dates = [datetime(2020, 1, 1) + timedelta(days=i % 3660) for i in range(n_rows)]
+    weather = {
+        "rainfall_30d_mm": np.round(rng.gamma(2, 40, n_rows), 1).tolist(),
+        "rainfall_last7d_mm": np.round(rng.gamma(1, 10, n_rows), 1).tolist(),
+        "temperature_avg_c": np.round(rng.normal(26, 2, n_rows), 1).tolist(),
+        "temperature_std_c": np.round(rng.gamma(2, 0.8, n_rows), 1).tolist(),
+        "heatwave_days_30d": rng.integers(0, 10, n_rows).tolist(),
+        "dry_spell_days_30d": rng.integers(0, 30, n_rows).tolist(),
+    }
+    return proba, dates, weather
+
+
+def old_rows(proba, dates, weather):
+    # The per-row loop the endpoints used before results were kept as columns
+    pred_enc = proba.argmax(axis=1)
+    rows = []
+    for n, dt in enumerate(dates):
+        rows.append({
+            "week_prediction": LABELS[pred_enc[n]],
+            "probabilities": dict(zip(LABELS, proba[n].tolist())),
+            "forecast_range": {"start": str(dt.date()), "end": str((dt + timedelta(days=6)).date())},
+            "weather_data": {f: weather[f][n] for f in WEATHER_FEATURES},
+        })
+    return rows
+
+
+def table(proba, dates, weather):
+    return Table({
+        "week_prediction": np.asarray(LABELS)[proba.argmax(axis=1)].tolist(),
+        "probabilities": {label: proba[:, k].tolist() for k, label in enumerate(LABELS)},
+        "forecast_range": {
+            "start": [str(dt.date()) for dt in dates],
+            "end": [str((dt + timedelta(days=6)).date()) for dt in dates],
+        },
+        "weather_data": {f: weather[f] for f in WEATHER_FEATURES},
+    })
+
+
+def starlette_json(content):
+    # What JSONResponse.render does with an endpoint's return value
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def variants(proba, dates, weather):
+    return {
+        "rows, jsonable_encoder + json (before)": lambda: starlette_json(jsonable_encoder(old_rows(proba, dates, weather))),
+        "rows, Table + dumps": lambda: encoding.dumps(list(table(proba, dates, weather).rows())),
+        "columns, Table + dumps": lambda: encoding.dumps(table(proba, dates, weather).columnar()),
+        "ndjson, Table + dumps": lambda: b"".join(encoding._ndjson_chunks(table(proba, dates, weather))),
+    }
+
+
+def measure(fn, repeat):
+    body = fn()
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - t0) / repeat * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_result(args.rows)
+    orjson = encoding.orjson
+    backends = [("orjson", orjson), ("stdlib json", None)] if orjson is not None else [("stdlib json", None)]
+    print(f"{args.rows} rows; CPU ms per response (process time), payload KB")
+    for backend, module in backends:
+        encoding.orjson = module
+        print(f"\ndumps via {backend}")
+        for name, fn in variants(*data).items():
+            ms, size = measure(fn, args.repeat)
+            print(f"  {name:<40}{ms:>9.1f} ms{size / 1024:>10.1f} KB")
+    encoding.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Locality index lookups: grid-bucket LocalityIndex vs a brute-force scan.
+
+Registers N random points over a Bangalore-sized area, checks that every
+k-nearest answer matches a brute-force search, and reports per-lookup
+latency for queries inside and well outside the registered area. Run
+from the repository root:
+
+    python benchmarks/bench_spatial.py [--points 1000,10000,50000] [--queries 5000] [--k 1,4]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from aquaearth.spatial import LocalityIndex
+
+# Roughly the Bangalore urban area
+LAT_RANGE = (12.80, 13.15)
+LON_RANGE = (77.45, 77.80)
+
+
+def brute_force(index, lat, lon, k):
+    dist = np.hypot(index.x - lon * index._kx, index.y - lat * index._ky)
+    order = np.argsort(dist, kind="stable")[:k]
+    return dist[order]
+
+
+def bench(n_points, n_queries, k, rng):
+    lat = rng.uniform(*LAT_RANGE, n_points)
+    lon = rng.uniform(*LON_RANGE, n_points)
+    t0 = time.perf_counter()
+    index = LocalityIndex(lat, lon)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    # Most traffic is inside the area; some comes from far outside it
+    q_lat = rng.uniform(LAT_RANGE[0] - 0.05, LAT_RANGE[1] + 0.05, n_queries)
+    q_lon = rng.uniform(LON_RANGE[0] - 0.05, LON_RANGE[1] + 0.05, n_queries)
+    q_lat[::10] = rng.uniform(8, 20, len(q_lat[::10]))
+    q_lon[::10] = rng.uniform(70, 85, len(q_lon[::10]))
+
+    times = []
+    for qa, qo in zip(q_lat.tolist(), q_lon.tolist()):
+        t0 = time.perf_counter()
+        _, dist = index.nearest(qa, qo, k)
+        times.append(time.perf_counter() - t0)
+        if not np.allclose(dist, brute_force(index, qa, qo, k)):
+            raise AssertionError(f"Wrong neighbours for ({qa}, {qo}), k={k}")
+    us = np.array(times) * 1e6
+    return build_ms, float(np.median(us)), float(np.percentile(us, 99)), float(us.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=lambda s: [int(n) for n in s.split(",")], default=[21, 1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--k", type=lambda s: [int(n) for n in s.split(",")], default=[1, 4])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8}{'k':>4}{'build ms':>10}{'p50 us':>9}{'p99 us':>9}{'max us':>9}")
+    for n in args.points:
+        for k in args.k:
+            build_ms, p50, p99, worst = bench(n, args.queries, k, rng)
+            print(f"{n:>8}{k:>4}{build_ms:>10.1f}{p50:>9.1f}{p99:>9.1f}{worst:>9.1f}")
+    print("\nAll lookups matched a brute-force search.")
+
+
+if __name__ == "__main__":
+    main()
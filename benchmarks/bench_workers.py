@@ -0,0 +1,79 @@
+"""Throughput vs worker processes and inference threads, for sizing deployments.
+
+Runs benchmarks/load_test.py once per WORKERSxTHREADS configuration
+(0 workers: one plain uvicorn process with xgboost's default threading)
+and prints requests/s, latency and memory side by side. Run it on the
+machine type you deploy to, from the repository root:
+
+    python benchmarks/bench_workers.py --configs 0x0,1x1,2x1,4x1,4x2,8x1 --out workers.json
+
+How to read it:
+
+- Throughput should grow with workers until they reach the core count;
+  past that, workers only add context switches and memory.
+- workers x threads above the core count oversubscribes the CPU: single
+  predictions are far too small for OpenMP to pay off, so 1 thread per
+  worker is normally fastest and extra threads only show up as p95.
+- "PSS MB" counts pages shared by the forked workers once; the gap to
+  "RSS MB" is what preloading the model before forking saves.
+"""
+import argparse
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import load_test
+
+
+def parse_configs(text):
+    configs = []
+    for item in text.split(","):
+        workers, _, threads = item.partition("x")
+        configs.append((int(workers), int(threads or 0)))
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", choices=sorted(load_test.APPS), default="backend")
+    parser.add_argument("--configs", type=parse_configs, default=parse_configs("0x0,1x1,2x1,4x1"),
+                        help="comma-separated WORKERSxTHREADS (default: 0x0,1x1,2x1,4x1)")
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=["predict_week", "forecast_7day"])
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[32])
+    parser.add_argument("--requests", type=int, default=600, help="requests per endpoint, level and config")
+    parser.add_argument("--out", help="write all results as JSON here")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'threads':>8}  {'endpoint':<16}{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'RSS MB':>9}{'PSS MB':>9}")
+    results = []
+    for workers, threads in args.configs:
+        run_args = SimpleNamespace(
+            app=args.app, endpoints=args.endpoints, concurrency=args.concurrency, requests=args.requests,
+            warmup=40, batch_size=21, upstream_latency_ms=50.0, upstream_jitter_ms=20.0,
+            upstream_error_rate=0.0, workers=workers, threads=threads, quiet=True,
+        )
+        # load_test prints its own per-level line; keep only the summary table
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                result = load_test.run(run_args)
+            finally:
+                sys.stdout = stdout
+        results.append(result)
+        for endpoint, levels in result["results"].items():
+            for level, r in levels.items():
+                print(f"{workers or '-':>8}{threads or 'auto':>8}  {endpoint:<16}{level:>5}{r['rps']:>9.1f}"
+                      f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['app_rss_mb'] or 0:>9.1f}{r['app_pss_mb'] or 0:>9.1f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
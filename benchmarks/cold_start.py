@@ -0,0 +1,91 @@
+"""Cold-start timings for the serverless entry point (api/index.py).
+
+Each run starts a fresh interpreter, imports api/index.py, then sends a
+health check and a first /api/predict_week through the ASGI app. Open-Meteo
+is replaced by a fixed weather block so the numbers measure our own cold
+path only. Exits non-zero when a median exceeds its budget, so it can run
+in CI to catch regressions:
+
+    python benchmarks/cold_start.py --runs 5 --max-import-ms 1500 --max-first-request-ms 3000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import index
+t_import = time.perf_counter()
+
+async def fixed_weather(lat, lon, end_date):
+    return {"rainfall_30d_mm": 84.2, "rainfall_last7d_mm": 12.5, "temperature_avg_c": 27.3,
+            "temperature_std_c": 1.8, "heatwave_days_30d": 3, "dry_spell_days_30d": 17}
+index.fetch_last30_days_weather = fixed_weather
+
+from fastapi.testclient import TestClient
+client = TestClient(index.app)
+t_client = time.perf_counter()
+assert client.get("/api").status_code == 200
+t_health = time.perf_counter()
+body = {"prediction_date": "2025-06-01", "locality": "Whitefield", "household_size": 4,
+        "usage_per_person_lpd": 135, "avg_demand_liters": 540, "avg_supply_liters": 400,
+        "avg_supply_hours": 3, "tanker_trips_30d": 2, "tanker_days_30d": 2}
+r = client.post("/api/predict_week", json=body)
+assert r.status_code == 200 and "week_prediction" in r.json(), r.text
+t_predict = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "first_health_ms": (t_health - t_client) * 1000,
+    "first_request_ms": (t_predict - t_health) * 1000,
+    "import_to_first_prediction_ms": (t_import - t0 + t_predict - t_client) * 1000,
+}))
+"""
+
+
+def run_once():
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, os.path.join(ROOT, "api")],
+        capture_output=True, text=True, check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-request-ms", type=float, default=None)
+    parser.add_argument("--json", help="also write the medians to this file")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    medians = {k: round(statistics.median(r[k] for r in runs), 1) for k in runs[0]}
+    for k, v in medians.items():
+        print(f"{k:<32}{v:>10.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(medians, f, indent=2)
+
+    failed = []
+    if args.max_import_ms is not None and medians["import_ms"] > args.max_import_ms:
+        failed.append(f"import {medians['import_ms']} ms > {args.max_import_ms} ms")
+    if args.max_first_request_ms is not None and medians["first_request_ms"] > args.max_first_request_ms:
+        failed.append(f"first request {medians['first_request_ms']} ms > {args.max_first_request_ms} ms")
+    if failed:
+        print("Cold-start budget exceeded: " + "; ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Local stand-in for the Open-Meteo archive and forecast APIs.
+
+Serves deterministic daily series (the same coordinate and date always
+give the same values) with optional injected latency and error rate, so
+load tests measure this service rather than Open-Meteo:
+
+    python benchmarks/fake_open_meteo.py --port 8090 --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+
+Point the service at it with
+OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8090/v1/archive and
+OPEN_METEO_FORECAST_URL=http://127.0.0.1:8090/v1/forecast.
+"""
+import argparse
+import asyncio
+import random
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DAILY_VARS = ["temperature_2m_max", "temperature_2m_min", "temperature_2m_mean", "precipitation_sum"]
+
+
+def daily_series(lat, lon, start, n_days):
+    """Deterministic, plausible Bangalore-like daily weather for ``n_days`` from ``start``."""
+    ordinals = np.arange(start.toordinal(), start.toordinal() + n_days)
+    seed = int(abs(lat * 1000 + lon * 100)) % 1000
+    # Per-day noise from a hash of (coordinate, date), independent of the requested span
+    noise = np.array([np.random.default_rng(o + seed * 1_000_003).random(3) for o in ordinals]).reshape(n_days, 3)
+    season = np.sin(2 * np.pi * (ordinals % 365) / 365)
+    mean = np.round(26 + 4 * season + 3 * (noise[:, 0] - 0.5), 1)
+    rain = np.where(noise[:, 1] < 0.35, np.round(noise[:, 2] * 30, 1), 0.0)
+    return {
+        "time": [date.fromordinal(int(o)).isoformat() for o in ordinals],
+        "temperature_2m_max": np.round(mean + 4 + 6 * noise[:, 2], 1).tolist(),
+        "temperature_2m_min": np.round(mean - 5, 1).tolist(),
+        "temperature_2m_mean": mean.tolist(),
+        "precipitation_sum": rain.tolist(),
+    }
+
+
+def create_app(latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+    app = FastAPI(title="Fake Open-Meteo")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "points": 0}
+
+    async def respond(request, series_for):
+        stats["requests"] += 1
+        delay = latency_ms + rng.uniform(0, jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=503, content={"error": True, "reason": "injected failure"})
+
+        params = request.query_params
+        lats = [float(v) for v in params["latitude"].split(",")]
+        lons = [float(v) for v in params["longitude"].split(",")]
+        stats["points"] += len(lats)
+        bodies = [
+            {"latitude": lat, "longitude": lon, "timezone": params.get("timezone", "GMT"),
+             "daily": series_for(lat, lon, params)}
+            for lat, lon in zip(lats, lons)
+        ]
+        # Open-Meteo answers a multi-coordinate request with a list
+        return bodies if len(bodies) > 1 else bodies[0]
+
+    @app.get("/v1/archive")
+    async def archive(request: Request):
+        def series_for(lat, lon, params):
+            start = date.fromisoformat(params["start_date"])
+            end = date.fromisoformat(params["end_date"])
+            return daily_series(lat, lon, start, (end - start).days + 1)
+        return await respond(request, series_for)
+
+    @app.get("/v1/forecast")
+    async def forecast(request: Request):
+        def series_for(lat, lon, params):
+            past_days = int(params.get("past_days", 0))
+            forecast_days = int(params.get("forecast_days", 7))
+            return daily_series(lat, lon, date.today() - timedelta(days=past_days), past_days + forecast_days)
+        return await respond(request, series_for)
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.seed),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Load test for backend/app.py or api/index.py against a local fake Open-Meteo.
+
+Starts benchmarks/fake_open_meteo.py and the app under uvicorn as
+separate processes, then drives each endpoint at fixed concurrency levels
+and records p50/p95/p99 latency, throughput, errors and the RSS of both
+processes. Results are written as JSON; with --baseline, a p95 latency,
+throughput or memory regression beyond --tolerance exits non-zero:
+
+    python benchmarks/load_test.py --app backend --out load.json
+    python benchmarks/load_test.py --app backend --baseline load.json --tolerance 0.25
+    python benchmarks/load_test.py --app api --upstream-latency-ms 80 --upstream-error-rate 0.02
+    python benchmarks/load_test.py --app backend --workers 4 --threads 1
+
+With --workers the app runs under aquaearth/serve.py (forked workers
+sharing the preloaded model) instead of a single uvicorn process; memory
+is then summed over the parent and its workers, and the proportional set
+size (shared pages counted once) is reported next to the RSS.
+
+The app gets a fresh weather store per run, so the first requests of each
+endpoint populate its caches the way a freshly deployed instance would.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "backend": ("app:app", os.path.join(ROOT, "backend")),
+    "api": ("index:app", os.path.join(ROOT, "api")),
+}
+ENDPOINTS = ["predict_week", "forecast_7day", "predict_batch", "citywide_forecast"]
+LOCALITIES = ["Whitefield", "Koramangala", "Yelahanka", "Jayanagar", "Hebbal", "Bellandur"]
+# Metrics checked against the baseline: (key, worse when the value goes "up" or "down")
+CHECKS = [("p95_ms", "up"), ("rps", "down"), ("app_rss_mb", "up")]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    """(current, peak) resident set size of ``pid`` in MB, from /proc."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, kb = line.split()[:2]
+                    values[key] = int(kb) / 1024
+    except OSError:
+        return None, None
+    return values.get("VmRSS:"), values.get("VmHWM:")
+
+
+def wait_ready(url, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def household(i):
+    return {
+        "household_size": 2 + i % 5, "usage_per_person_lpd": 100 + 10 * (i % 6),
+        "avg_demand_liters": 400 + 40 * (i % 7), "avg_supply_liters": 300 + 30 * (i % 5),
+        "avg_supply_hours": 1.5 + i % 4, "tanker_trips_30d": i % 4, "tanker_days_30d": i % 3,
+    }
+
+
+def make_bodies(endpoint, n, batch_size):
+    """Deterministic request bodies; localities and dates repeat, as real traffic does."""
+    dates = [(date.today() - timedelta(days=30 + 45 * k)).isoformat() for k in range(8)]
+    rows = [
+        {**household(i), "locality": LOCALITIES[i % len(LOCALITIES)], "prediction_date": dates[i % len(dates)]}
+        for i in range(max(n, batch_size))
+    ]
+    if endpoint == "predict_batch":
+        return [[rows[(i * batch_size + j) % len(rows)] for j in range(batch_size)] for i in range(n)]
+    if endpoint == "citywide_forecast":
+        return [household(i) for i in range(n)]
+    return rows[:n]
+
+
+def ok(response):
+    if response.status_code != 200:
+        return False
+    body = response.json()
+    return not (isinstance(body, dict) and "error" in body)
+
+
+async def drive(base_url, endpoint, bodies, concurrency):
+    """POST every body with ``concurrency`` workers; latencies in seconds.
+
+    Each worker has its own single-connection client, like independent
+    callers: a pool shared by all workers spends more CPU re-assigning
+    queued requests to connections than the app spends serving them once
+    responses start arriving in bursts.
+    """
+    latencies, errors = [], 0
+    queue = iter(bodies)
+
+    async def worker():
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            for body in queue:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.post(f"/{endpoint}", json=body)
+                    good = ok(r)
+                except httpx.HTTPError:
+                    good = False
+                if good:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return latencies, errors, wall
+
+
+def process_tree(pid):
+    """``pid`` and its direct children (the forked workers)."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [pid, *map(int, f.read().split())]
+    except OSError:
+        return [pid]
+
+
+def pss_mb(pid):
+    """Proportional set size of ``pid`` in MB: shared pages split between their users."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def tree_memory_mb(pid):
+    """(RSS, peak RSS, PSS) summed over ``pid`` and its workers."""
+    rss, peak, pss = 0.0, 0.0, 0.0
+    for p in process_tree(pid):
+        current, high = rss_mb(p)
+        proportional = pss_mb(p)
+        if current is None:
+            continue
+        rss += current
+        peak += high or 0
+        pss = pss + proportional if pss is not None and proportional is not None else None
+    return rss or None, peak or None, pss or None
+
+
+def summarize(latencies, errors, wall, app_pid, upstream_pid):
+    ms = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    app_rss, app_peak, app_pss = tree_memory_mb(app_pid)
+    upstream_rss, _ = rss_mb(upstream_pid)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "rps": round(len(latencies) / wall, 1),
+        "app_rss_mb": round(app_rss, 1) if app_rss else None,
+        "app_peak_rss_mb": round(app_peak, 1) if app_peak else None,
+        "app_pss_mb": round(app_pss, 1) if app_pss else None,
+        "upstream_rss_mb": round(upstream_rss, 1) if upstream_rss else None,
+    }
+
+
+def run(args):
+    upstream_port, app_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+    procs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            upstream = subprocess.Popen([
+                sys.executable, os.path.join(ROOT, "benchmarks", "fake_open_meteo.py"),
+                "--port", str(upstream_port), "--latency-ms", str(args.upstream_latency_ms),
+                "--jitter-ms", str(args.upstream_jitter_ms), "--error-rate", str(args.upstream_error_rate),
+            ])
+            procs.append(upstream)
+            wait_ready(f"{upstream_url}/stats", upstream)
+
+            module, cwd = APPS[args.app]
+            if args.workers:
+                cmd = [sys.executable, "-m", "aquaearth.serve", module, "--app-dir", cwd,
+                       "--workers", str(args.workers), "--threads", str(args.threads)]
+                cwd = ROOT
+            else:
+                cmd = [sys.executable, "-m", "uvicorn", module]
+            env = {
+                **os.environ,
+                "OPEN_METEO_ARCHIVE_URL": f"{upstream_url}/v1/archive",
+                "OPEN_METEO_FORECAST_URL": f"{upstream_url}/v1/forecast",
+                "WEATHER_STORE_PATH": os.path.join(tmp, "weather.sqlite"),
+            }
+            app = subprocess.Popen(
+                [*cmd, "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"],
+                cwd=cwd, env=env, stdout=subprocess.DEVNULL if args.quiet else None,
+                stderr=subprocess.DEVNULL if args.quiet else None,
+            )
+            procs.append(app)
+            wait_ready(f"{app_url}/", app)
+
+            results = {}
+            for endpoint in args.endpoints:
+                results[endpoint] = {}
+                # Unmeasured warm-up: model load, first weather fetches
+                asyncio.run(drive(app_url, endpoint, make_bodies(endpoint, args.warmup, args.batch_size), 4))
+                for c in args.concurrency:
+                    bodies = make_bodies(endpoint, args.requests, args.batch_size)
+                    latencies, errors, wall = asyncio.run(drive(app_url, endpoint, bodies, c))
+                    summary = summarize(latencies, errors, wall, app.pid, upstream.pid)
+                    results[endpoint][str(c)] = summary
+                    print(f"{endpoint:<18}{c:>5}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}"
+                          f"{summary['p99_ms']:>10.1f}{summary['rps']:>10.1f}{summary['errors']:>8}"
+                          f"{summary['app_rss_mb'] or 0:>10.1f}")
+            upstream_stats = httpx.get(f"{upstream_url}/stats").json()
+        finally:
+            for p in procs:
+                p.terminate()
+            for p in procs:
+                try:
+                    p.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+
+    return {
+        "meta": {
+            "app": args.app,
+            "workers": args.workers,
+            "threads": args.threads,
+            "concurrency": args.concurrency,
+            "requests_per_level": args.requests,
+            "batch_size": args.batch_size,
+            "upstream": {"latency_ms": args.upstream_latency_ms, "jitter_ms": args.upstream_jitter_ms,
+                         "error_rate": args.upstream_error_rate, **upstream_stats},
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of ``current`` against ``baseline`` beyond ``tolerance`` (a fraction)."""
+    regressions = []
+    for endpoint, levels in current["results"].items():
+        for level, now in levels.items():
+            before = baseline.get("results", {}).get(endpoint, {}).get(level)
+            if before is None:
+                continue
+            for key, worse in CHECKS:
+                if now.get(key) is None or not before.get(key):
+                    continue
+                change = (now[key] - before[key]) / before[key]
+                if (worse == "up" and change > tolerance) or (worse == "down" and -change > tolerance):
+                    regressions.append(f"{endpoint} @ {level}: {key} {before[key]} -> {now[key]} ({change:+.0%})")
+            if now["errors"] > before["errors"]:
+                regressions.append(f"{endpoint} @ {level}: errors {before['errors']} -> {now['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", choices=sorted(APPS), default="backend")
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=ENDPOINTS,
+                        help=f"comma-separated (default: {','.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32],
+                        help="comma-separated concurrency levels (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+    parser.add_argument("--batch-size", type=int, default=21, help="rows per /predict_batch request")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="serve with this many forked workers (default: one plain uvicorn process)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="native inference threads per worker with --workers (default: cores / workers)")
+    parser.add_argument("--quiet", action="store_true", help="hide the app's own logs")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<18}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}{'RSS MB':>10}")
+    result = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for r in regressions:
+                print(f"  {r}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -68,18 +68,15 @@ const Forecast = () => {
             tanker_days_30d: 0
         };
 
+        // GET with the keys in sorted order is the canonical, CDN-cacheable URL
+        const query = new URLSearchParams(
+            Object.entries(requestBody).sort(([a], [b]) => (a < b ? -1 : 1))
+        ).toString();
+
         try {
             const [resPredict, resTimeline] = await Promise.all([
-                fetch('/api/predict_week', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(requestBody),
-                }),
-                fetch('/api/forecast_7day', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(requestBody),
-                })
+                fetch(`/api/predict_week?${query}`),
+                fetch(`/api/forecast_7day?${query}`)
             ]);
 
             if (!resPredict.ok || !resTimeline.ok) {
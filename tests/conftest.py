@@ -0,0 +1,126 @@
+import importlib.util
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+# The servers and benchmarks import aquaearth from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The weather store is opened when aquaearth.weather is imported; keep it
+# out of the repository's cache directory
+os.environ.setdefault("WEATHER_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="aquaearth-tests-"), "weather.sqlite"))
+
+
+def daily_series(lat, lon, start, n_days):
+    """Deterministic Open-Meteo style daily series for a point."""
+    seed = int(abs(lat * 1000 + lon * 100)) % 1000
+    out = {"time": [], "temperature_2m_max": [], "temperature_2m_min": [], "temperature_2m_mean": [],
+           "precipitation_sum": []}
+    for i in range(n_days):
+        day = start + timedelta(days=i)
+        rng = np.random.default_rng(day.toordinal() + seed)
+        mean = round(24 + 6 * np.sin((day.toordinal() + seed) / 30) + rng.normal(0, 2), 1)
+        out["time"].append(day.isoformat())
+        out["temperature_2m_mean"].append(mean)
+        out["temperature_2m_max"].append(round(mean + 4 + rng.random() * 8, 1))
+        out["temperature_2m_min"].append(round(mean - 5, 1))
+        out["precipitation_sum"].append(round(max(0.0, rng.normal(0, 6)), 1))
+    return out
+
+
+class FakeOpenMeteo:
+    """Stands in for the archive and forecast APIs behind every httpx.AsyncClient.
+
+    ``respond`` may be replaced to script failures; ``requests`` records
+    every request that reached it.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.respond = self.open_meteo
+
+    def __call__(self, request):
+        self.requests.append(request)
+        return self.respond(request)
+
+    @staticmethod
+    def open_meteo(request):
+        params = request.url.params
+        points = list(zip(params["latitude"].split(","), params["longitude"].split(",")))
+        if "archive" in request.url.host:
+            start, end = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+            span = (start, (end - start).days + 1)
+        else:
+            past = int(params.get("past_days", 0))
+            span = (date.today() - timedelta(days=past), past + int(params.get("forecast_days", 7)))
+        bodies = [{"daily": daily_series(float(lat), float(lon), *span)} for lat, lon in points]
+        return httpx.Response(200, json=bodies if len(bodies) > 1 else bodies[0])
+
+
+@pytest.fixture
+def open_meteo(monkeypatch):
+    fake = FakeOpenMeteo()
+    transport = httpx.MockTransport(fake)
+    original = httpx.AsyncClient
+
+    class Client(original):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("http2", None)
+            super().__init__(*args, transport=transport, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", Client)
+    from aquaearth import weather
+    weather.weather_cache.clear()
+    weather.upstream._client = None
+    yield fake
+    weather.weather_cache.clear()
+    weather.upstream._client = None
+
+
+# Each server with the directory it is run from
+APPS = {"backend": "backend/app.py", "api": "api/index.py"}
+HOUSEHOLD = {
+    "household_size": 4,
+    "usage_per_person_lpd": 120.0,
+    "avg_demand_liters": 500,
+    "avg_supply_liters": 350,
+    "avg_supply_hours": 6.0,
+    "tanker_trips_30d": 2,
+    "tanker_days_30d": 0,
+}
+_apps = {}
+
+
+def load_app(name):
+    """Import a server module once, from its own directory as it is deployed."""
+    if name not in _apps:
+        path = os.path.join(ROOT, APPS[name])
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(path))
+        try:
+            spec = importlib.util.spec_from_file_location(f"{name}_app", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        finally:
+            os.chdir(cwd)
+        _apps[name] = module
+    return _apps[name]
+
+
+@pytest.fixture(params=sorted(APPS))
+def server(request, open_meteo, monkeypatch):
+    module = load_app(request.param)
+    monkeypatch.chdir(os.path.dirname(os.path.join(ROOT, APPS[request.param])))
+    return module
+
+
+@pytest.fixture
+def client(server):
+    with TestClient(server.app) as client:
+        yield client
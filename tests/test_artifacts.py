@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from aquaearth.artifacts import (CURRENT_FILE, META_FILE, MODEL_FILE, LazyEngine, check_artifact, current_version,
+                                 load_artifact, publish_artifact, save_artifact)
+from aquaearth.localities import LocalityTable
+from conftest import ROOT
+
+API_MODEL_DIR = os.path.join(ROOT, "api", "models")
+TABLE = LocalityTable.load()
+
+
+def test_served_models_know_every_locality(caplog):
+    with open(os.path.join(API_MODEL_DIR, META_FILE)) as f:
+        api_categories = json.load(f)["categories"]
+    pipeline = joblib.load(os.path.join(ROOT, "backend", "models", "water_week_xgb_model.pkl"))
+    backend_categories = pipeline.named_steps["prep"].named_transformers_["cat"].categories_[0]
+    for categories in (api_categories, backend_categories):
+        with caplog.at_level(logging.WARNING, logger="aquaearth.localities"):
+            ids = TABLE.category_ids(categories)
+        assert caplog.records == []
+        assert sorted(ids.tolist()) == list(range(len(categories)))
+
+
+@pytest.fixture(scope="module")
+def booster():
+    xgb = pytest.importorskip("xgboost")
+    booster = xgb.Booster()
+    booster.load_model(os.path.join(API_MODEL_DIR, MODEL_FILE))
+    return booster
+
+
+@pytest.fixture(scope="module")
+def meta():
+    with open(os.path.join(API_MODEL_DIR, META_FILE)) as f:
+        return json.load(f)
+
+
+def publish(booster, meta, model_dir, **kwargs):
+    return publish_artifact(booster, meta["categories"], meta["labels"], str(model_dir), **kwargs)
+
+
+def test_backends_load_the_same_model(meta):
+    X = np.random.default_rng(0).uniform(0, 50, (200, meta["num_features"])).astype(np.float32)
+    xgboost = load_artifact(API_MODEL_DIR, TABLE, backend="xgboost")
+    numpy = load_artifact(API_MODEL_DIR, TABLE, backend="numpy")
+    assert xgboost.labels == numpy.labels == meta["labels"]
+    np.testing.assert_allclose(numpy.predict_proba(X), xgboost.predict_proba(X), atol=1e-6)
+
+
+def test_incomplete_and_incompatible_artifacts(tmp_path, booster, meta):
+    with pytest.raises(FileNotFoundError, match="Model artifact missing"):
+        check_artifact(str(tmp_path))
+    save_artifact(booster, meta["categories"], meta["labels"], str(tmp_path))
+    check_artifact(str(tmp_path))
+    with open(tmp_path / META_FILE) as f:
+        saved = json.load(f)
+    saved["numeric_features"] = saved["numeric_features"][1:]
+    with open(tmp_path / META_FILE, "w") as f:
+        json.dump(saved, f)
+    with pytest.raises(ValueError, match="Incompatible model artifact metadata"):
+        load_artifact(str(tmp_path), TABLE)
+
+
+def test_publish_keeps_the_newest_versions(tmp_path, booster, meta):
+    versions = [publish(booster, meta, tmp_path, keep=2) for _ in range(3)]
+    assert current_version(str(tmp_path)) == versions[-1]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([CURRENT_FILE, *versions[1:]])
+
+
+def test_hot_swap(tmp_path, booster, meta):
+    first = publish(booster, meta, tmp_path)
+    lazy = LazyEngine(str(tmp_path), TABLE, backend="xgboost")
+    old = lazy.get()
+    assert lazy.get() is old and lazy.info["version"] == first
+    assert not lazy.reload()
+
+    # A retrained model: one round fewer, so its fingerprint differs
+    second = publish(booster[:booster.num_boosted_rounds() - 1], meta, tmp_path)
+    assert lazy.reload()
+    assert lazy.engine is not old and lazy.info["version"] == second
+    assert lazy.engine.fingerprint != old.fingerprint
+    # A request that took the old engine can still finish with it
+    X = np.zeros((1, meta["num_features"]), dtype=np.float32)
+    assert old.predict_proba(X).shape == (1, len(meta["labels"]))
+    assert lazy.stats()["reloads"] == 1
+
+
+def test_broken_version_keeps_the_serving_model(tmp_path, booster, meta, caplog):
+    publish(booster, meta, tmp_path)
+    lazy = LazyEngine(str(tmp_path), TABLE, backend="xgboost")
+    serving = lazy.get()
+    broken = publish(booster, meta, tmp_path)
+    os.remove(tmp_path / broken / MODEL_FILE)
+    with caplog.at_level(logging.ERROR, logger="aquaearth.artifacts"):
+        assert not lazy.reload()
+        assert not lazy.reload()
+    assert lazy.engine is serving
+    assert lazy.reload_failures == 1 and len(caplog.records) == 1
+    assert lazy.stats()["published_version"] == broken
@@ -0,0 +1,55 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from aquaearth.backtest import BACKTEST_MAX_DAYS
+from aquaearth.encoding import COLUMNS, NDJSON
+from conftest import HOUSEHOLD
+
+START = date(2024, 10, 1)
+
+
+def archive_requests(open_meteo):
+    return [r for r in open_meteo.requests if "archive" in r.url.host]
+
+
+def day(i):
+    return (START + timedelta(days=i)).isoformat()
+
+
+@pytest.mark.parametrize("place", [{"locality": "Koramangala"}, {"lat": 12.95, "lon": 77.6}])
+def test_days_match_predict_week(client, place):
+    response = client.post("/backtest", json=dict(HOUSEHOLD, **place, start_date=day(0), end_date=day(99)))
+    assert response.headers["content-type"] == NDJSON
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 100
+    for i in (0, 1, 29, 30, 57, 99):
+        single = client.post("/predict_week", json=dict(HOUSEHOLD, **place, prediction_date=day(i))).json()
+        # The resolved place is the same for every day, so backtest rows leave it out
+        single.pop("location", None)
+        assert rows[i] == single
+
+
+def test_one_archive_request_for_the_range(client, open_meteo):
+    client.post("/backtest", json=dict(HOUSEHOLD, locality="Yelahanka", start_date="2022-01-01",
+                                       end_date="2022-12-31"))
+    assert len(archive_requests(open_meteo)) <= 1
+
+
+def test_columns(client):
+    body = client.post("/backtest", json=dict(HOUSEHOLD, locality="Koramangala", start_date=day(0), end_date=day(9)),
+                       headers={"Accept": COLUMNS}).json()
+    assert body["rows"] == 10
+    assert body["forecast_range"]["start"] == [day(i) for i in range(10)]
+
+
+@pytest.mark.parametrize("start, end, message", [
+    ("2025-01-02", "2025-01-01", "end_date is before start_date"),
+    ("2000-01-01", "2025-09-30", f"max {BACKTEST_MAX_DAYS}"),
+    ("2025-01-01", (date.today() + timedelta(days=1)).isoformat(), "end_date must be in the past"),
+])
+def test_invalid_ranges(client, open_meteo, start, end, message):
+    body = client.post("/backtest", json=dict(HOUSEHOLD, locality="Koramangala", start_date=start, end_date=end)).json()
+    assert message in body["error"]
+    assert archive_requests(open_meteo) == []
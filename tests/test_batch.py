@@ -0,0 +1,55 @@
+import httpx
+
+from aquaearth import batch
+from conftest import HOUSEHOLD, FakeOpenMeteo
+
+
+def row(locality, prediction_date, **fields):
+    return dict(HOUSEHOLD, locality=locality, prediction_date=prediction_date, **fields)
+
+
+def test_rows_match_predict_week(client):
+    reqs = [
+        row("Whitefield", "2025-03-01"),
+        row("Whitefield", "2025-03-01", household_size=2),
+        row("Koramangala", "2024-11-17", avg_supply_hours=2.5),
+        dict(HOUSEHOLD, lat=12.94, lon=77.61, prediction_date="2025-03-01"),
+    ]
+    rows = client.post("/predict_batch", json=reqs).json()
+    assert rows == [client.post("/predict_week", json=req).json() for req in reqs]
+
+
+def test_bad_rows_do_not_fail_the_batch(client):
+    rows = client.post("/predict_batch", json=[
+        row("Atlantis", "2025-03-01"),
+        row("Whitefield", "not a date"),
+        row("Whitefield", "2025-03-01"),
+    ]).json()
+    assert rows[0] == {"error": "Locality not supported"}
+    assert rows[1] == {"error": "Invalid prediction_date: 'not a date'"}
+    assert rows[2]["week_prediction"] in rows[2]["probabilities"]
+
+
+def test_weather_failure_only_fails_its_rows(client, server, open_meteo):
+    lat, _ = server.LOCALITIES.coords(server.LOCALITIES.names.index("Kengeri"))
+
+    def respond(request):
+        params = request.url.params
+        if "archive" in request.url.host and float(params["latitude"]) == lat and params["end_date"] >= "2023-08-14":
+            return httpx.Response(400)
+        return FakeOpenMeteo.open_meteo(request)
+
+    open_meteo.respond = respond
+    rows = client.post("/predict_batch", json=[
+        row("Kengeri", "2023-08-21"),
+        row("Whitefield", "2023-08-21"),
+        row("Kengeri", "2023-08-21", household_size=6),
+    ]).json()
+    assert rows[0] == rows[2] == {"error": "Weather data unavailable"}
+    assert "week_prediction" in rows[1]
+
+
+def test_batch_size_limit(client):
+    n = batch.MAX_BATCH_SIZE + 1
+    body = client.post("/predict_batch", json=[row("Whitefield", "2025-03-01")] * n).json()
+    assert body == {"error": f"Batch too large: {n} rows (max {batch.MAX_BATCH_SIZE})"}
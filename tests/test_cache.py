@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from aquaearth.cache import TTLCache
+
+
+def test_single_flight_loads_once():
+    calls = []
+
+    async def main():
+        cache = TTLCache(name="test")
+        release = asyncio.Event()
+
+        async def loader():
+            calls.append(1)
+            await release.wait()
+            return "value"
+
+        waiters = [asyncio.ensure_future(cache.get_or_load("k", loader)) for _ in range(50)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return cache, results
+
+    cache, results = asyncio.run(main())
+    assert calls == [1]
+    assert results == ["value"] * 50
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 49, 0)
+
+
+def test_cached_value_is_served_until_it_expires():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        cache = TTLCache(ttl=60, name="test")
+        first = await cache.get_or_load("k", loader)
+        second = await cache.get_or_load("k", loader)
+        expired = await cache.get_or_load("e", loader, ttl=0)
+        reloaded = await cache.get_or_load("e", loader, ttl=0)
+        return first, second, expired, reloaded
+
+    assert asyncio.run(main()) == (1, 1, 2, 3)
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    calls = []
+
+    async def main():
+        cache = TTLCache(name="test")
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        async def working():
+            return "ok"
+
+        return await cache.get_or_load("k", working)
+
+    assert asyncio.run(main()) == "ok"
+    assert calls == [1]
+
+
+def test_cancelled_waiter_does_not_cancel_the_load():
+    async def main():
+        cache = TTLCache(name="test")
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        first = asyncio.ensure_future(cache.get_or_load("k", loader))
+        second = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, cache.peek("k")
+
+    assert asyncio.run(main()) == ("value", "value")
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, name="test")
+
+    async def main():
+        for key in ("a", "b"):
+            await cache.get_or_load(key, lambda: asyncio.sleep(0, key))
+        await cache.get_or_load("a", lambda: asyncio.sleep(0, "a"))
+        await cache.get_or_load("c", lambda: asyncio.sleep(0, "c"))
+
+    asyncio.run(main())
+    assert cache.peek("a") == "a"
+    assert cache.peek("b") is None
+    assert cache.peek("c") == "c"
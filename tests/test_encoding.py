@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from aquaearth import encoding
+from aquaearth.encoding import COLUMNS, NDJSON, ROWS, Table, dumps, negotiate
+from conftest import HOUSEHOLD
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, ROWS),
+    ("", ROWS),
+    ("*/*", ROWS),
+    (NDJSON, NDJSON),
+    (f"{COLUMNS}, {ROWS};q=0.5", COLUMNS),
+    (f"{ROWS};q=0.2, {NDJSON};q=0.9", NDJSON),
+    # The most specific range decides an offer's q
+    (f"application/*;q=0.1, {NDJSON}", NDJSON),
+    (f"application/*, {ROWS};q=0", COLUMNS),
+    ("text/html", ROWS),
+    (f"{NDJSON};q=0", ROWS),
+    (f"{NDJSON};q=oops, {COLUMNS}", COLUMNS),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def test_negotiate_only_picks_offers():
+    assert negotiate(COLUMNS, offers=(NDJSON, ROWS)) == NDJSON
+
+
+def table():
+    return Table({
+        "name": ["a", None, "c"],
+        "scores": {"x": [1.5, None, 3.0], "y": [None, None, 0.25]},
+        "error": [None, "bad", None],
+    })
+
+
+def test_rows_leave_out_missing_cells():
+    assert list(table().rows()) == [
+        {"name": "a", "scores": {"x": 1.5}},
+        {"error": "bad"},
+        {"name": "c", "scores": {"x": 3.0, "y": 0.25}},
+    ]
+    assert list(table().rows(1, 2)) == [{"error": "bad"}]
+    assert table().columnar()["rows"] == 3
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(encoding, "orjson", None)
+    obj = {"s": "Bengaluru ₹", "f": [0.1, 1e-7, 2.0], "n": None, "nested": {"b": True}}
+    assert json.loads(dumps(obj)) == obj
+    assert b" " not in dumps([1, 2, {"a": 3}])
+
+
+def test_ndjson_chunks(monkeypatch):
+    monkeypatch.setattr(encoding, "NDJSON_CHUNK_ROWS", 2)
+    chunks = list(encoding._ndjson_chunks(table()))
+    assert len(chunks) == 2
+    assert [json.loads(line) for line in b"".join(chunks).splitlines()] == list(table().rows())
+
+
+@pytest.mark.parametrize("accept", [ROWS, COLUMNS, NDJSON])
+def test_batch_formats_hold_the_same_rows(client, accept):
+    reqs = [dict(HOUSEHOLD, locality=name, prediction_date="2025-03-01") for name in ("Whitefield", "Atlantis")]
+    rows = client.post("/predict_batch", json=reqs).json()
+    response = client.post("/predict_batch", json=reqs, headers={"Accept": accept})
+    assert response.headers["content-type"].split(";")[0] == accept
+    assert "Accept" in response.headers["vary"]
+    if accept == NDJSON:
+        assert [json.loads(line) for line in response.text.splitlines()] == rows
+    elif accept == COLUMNS:
+        columns = response.json()
+        assert columns["rows"] == 2
+        assert columns["week_prediction"] == [rows[0]["week_prediction"], None]
+        assert columns["error"] == [None, rows[1]["error"]]
+    else:
+        assert response.json() == rows
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from aquaearth.features import DRY_DAY_RAIN_MM, HEATWAVE_TEMP_C, WINDOW_DAYS, rolling_weather_features
+
+
+def per_window(rain, temp_mean, temp_max, end_idx):
+    # The reference: slice and reduce every window on its own
+    out = {k: [] for k in ("rainfall_30d_mm", "rainfall_last7d_mm", "temperature_avg_c", "temperature_std_c",
+                           "heatwave_days_30d", "dry_spell_days_30d")}
+    for end in end_idx:
+        window = slice(end - WINDOW_DAYS + 1, end + 1)
+        out["rainfall_30d_mm"].append(round(float(rain[window].sum()), 1))
+        out["rainfall_last7d_mm"].append(round(float(rain[end - 6:end + 1].sum()), 1))
+        out["temperature_avg_c"].append(round(float(temp_mean[window].mean()), 1))
+        out["temperature_std_c"].append(round(float(temp_mean[window].std()), 1))
+        out["heatwave_days_30d"].append(int((temp_max[window] > HEATWAVE_TEMP_C).sum()))
+        out["dry_spell_days_30d"].append(int((rain[window] < DRY_DAY_RAIN_MM).sum()))
+    return out
+
+
+def series(rng, n, decimals=1):
+    rain = np.round(rng.gamma(0.6, 6, n) * (rng.random(n) < 0.5), 1)
+    temp_mean = np.round(rng.normal(26, 2.5, n), decimals)
+    temp_max = np.round(temp_mean + rng.normal(6, 3, n), 1)
+    return rain, temp_mean, temp_max
+
+
+def assert_same(got, expected):
+    assert got.keys() == expected.keys()
+    for key in expected:
+        # repr tells NaN from NaN and 1 from 1.0, so this is bit-identity
+        assert [repr(v) for v in got[key]] == [repr(v) for v in expected[key]], key
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_per_window_reductions(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(WINDOW_DAYS, 400))
+    rain, temp_mean, temp_max = series(rng, n, decimals=1 + seed % 3)
+    end_idx = np.arange(WINDOW_DAYS - 1, n)
+    got = rolling_weather_features(rain.tolist(), temp_mean.tolist(), temp_max.tolist(), end_idx)
+    assert_same(got, per_window(rain, temp_mean, temp_max, end_idx))
+
+
+def test_long_series_and_sparse_windows():
+    # A 10-year backtest span: the running sums must not drift into a rounding change
+    rng = np.random.default_rng(7)
+    n = 3700
+    rain, temp_mean, temp_max = series(rng, n)
+    end_idx = np.sort(rng.choice(np.arange(WINDOW_DAYS - 1, n), 500, replace=False))
+    got = rolling_weather_features(rain, temp_mean, temp_max, end_idx)
+    assert_same(got, per_window(rain, temp_mean, temp_max, end_idx))
+
+
+def test_constant_temperature_has_zero_std():
+    n = 90
+    got = rolling_weather_features(np.zeros(n), np.full(n, 25.0), np.full(n, 30.0), np.arange(WINDOW_DAYS - 1, n))
+    assert set(got["temperature_std_c"]) == {0.0}
+    assert set(got["temperature_avg_c"]) == {25.0}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_missing_days_only_affect_their_windows(seed):
+    rng = np.random.default_rng(100 + seed)
+    n = 300
+    rain, temp_mean, temp_max = series(rng, n)
+    for values in (rain, temp_mean, temp_max):
+        values[rng.random(n) < 0.01] = np.nan
+    end_idx = np.arange(WINDOW_DAYS - 1, n)
+    got = rolling_weather_features(rain, temp_mean, temp_max, end_idx)
+    assert_same(got, per_window(rain, temp_mean, temp_max, end_idx))
+
+
+def test_single_missing_day():
+    rng = np.random.default_rng(3)
+    n = 120
+    rain, temp_mean, temp_max = series(rng, n)
+    rain[40] = np.nan
+    temp_mean[40] = np.nan
+    end_idx = np.arange(WINDOW_DAYS - 1, n)
+    got = rolling_weather_features(rain, temp_mean, temp_max, end_idx)
+    containing = (end_idx >= 40) & (end_idx - WINDOW_DAYS + 1 <= 40)
+    for key in ("rainfall_30d_mm", "temperature_avg_c", "temperature_std_c"):
+        assert np.array_equal(np.isnan(got[key]), containing), key
+    assert_same(got, per_window(rain, temp_mean, temp_max, end_idx))
+
+
+def test_all_temperatures_missing():
+    n = 60
+    rng = np.random.default_rng(4)
+    rain = np.round(rng.gamma(0.6, 6, n), 1)
+    got = rolling_weather_features(rain, np.full(n, np.nan), np.full(n, np.nan), np.arange(WINDOW_DAYS - 1, n))
+    assert np.isnan(got["temperature_avg_c"]).all()
+    assert np.isnan(got["temperature_std_c"]).all()
+    assert set(got["heatwave_days_30d"]) == {0}
+    assert not np.isnan(got["rainfall_30d_mm"]).any()
@@ -0,0 +1,50 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from aquaearth.encoding import COLUMNS
+from conftest import HOUSEHOLD, FakeOpenMeteo
+
+
+def missing_a_day(request):
+    """An Open-Meteo reply whose series (the first, if several) misses a day."""
+    bodies = FakeOpenMeteo.open_meteo(request).json()
+    for values in (bodies[0] if isinstance(bodies, list) else bodies)["daily"].values():
+        del values[3]
+    return httpx.Response(200, json=bodies)
+
+
+def test_forecast(client):
+    rows = client.post("/forecast", json=dict(HOUSEHOLD, prediction_date="2025-03-01", locality="Whitefield", days=10)).json()
+    assert len(rows) == 10
+    assert [row["date"] for row in rows] == sorted(row["date"] for row in rows)
+
+
+def test_forecast_weather_error_is_an_error_body(client, open_meteo):
+    open_meteo.respond = missing_a_day
+    response = client.post("/forecast_7day", json=dict(HOUSEHOLD, prediction_date="2025-03-01", lat=13.01, lon=77.71))
+    assert response.status_code == 200
+    assert response.json() == {"error": response.json()["error"]}
+    assert "has no full window" in response.json()["error"]
+
+
+def test_citywide_weather_error_is_an_error_body(server, open_meteo, monkeypatch):
+    # Broken before the server starts, so its first refresh already fails
+    monkeypatch.setattr(server.forecast_blocks, "blocks", {})
+    open_meteo.respond = missing_a_day
+    with TestClient(server.app) as client:
+        response = client.post("/citywide_forecast", json=HOUSEHOLD)
+    assert response.status_code == 200
+    assert response.json()["error"].startswith(f"No forecast weather for {server.LOCALITIES.names[0]}")
+
+
+def test_citywide_matches_each_locality(client, server):
+    citywide = client.post("/citywide_forecast", json=HOUSEHOLD).json()
+    assert list(citywide) == server.LOCALITIES.names
+    for name in ("Whitefield", server.LOCALITIES.names[-1]):
+        rows = client.post("/forecast_7day", json=dict(HOUSEHOLD, prediction_date="2025-03-01", locality=name)).json()
+        assert citywide[name] == rows
+
+
+def test_citywide_columns(client, server):
+    columns = client.post("/citywide_forecast", json=HOUSEHOLD, headers={"Accept": COLUMNS}).json()
+    assert len(columns["locality"]) == 7 * len(server.LOCALITIES.names)
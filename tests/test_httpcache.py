@@ -0,0 +1,50 @@
+import itertools
+
+from aquaearth.httpcache import canonical_query, make_etag
+
+PARAMS = {
+    "household_size": 4,
+    "usage_per_person_lpd": 120.0,
+    "avg_supply_hours": 6.5,
+    "locality": "Whitefield",
+    "lat": None,
+    "lon": None,
+    "prediction_date": "2025-03-01",
+}
+
+
+def test_canonical_query_ignores_key_order():
+    queries = {canonical_query(dict(order)) for order in itertools.permutations(PARAMS.items())}
+    assert len(queries) == 1
+
+
+def test_canonical_query_form():
+    assert canonical_query(PARAMS) == (
+        "avg_supply_hours=6.5&household_size=4&locality=Whitefield"
+        "&prediction_date=2025-03-01&usage_per_person_lpd=120"
+    )
+
+
+def test_canonical_query_writes_integral_floats_as_ints():
+    assert canonical_query({"a": 6.0}) == canonical_query({"a": 6}) == "a=6"
+    assert canonical_query({"a": 0.1}) == "a=0.1"
+    assert canonical_query({"a": -2.0}) == "a=-2"
+
+
+def test_canonical_query_escapes_values():
+    assert canonical_query({"locality": "BTM layout", "q": "a&b"}) == "locality=BTM+layout&q=a%26b"
+
+
+def test_canonical_query_is_a_fixed_point():
+    # Parsing the canonical query back gives strings, which must not change it
+    from urllib.parse import parse_qsl
+    query = canonical_query(PARAMS)
+    assert canonical_query(dict(parse_qsl(query))) == query
+
+
+def test_etag_is_stable():
+    a = make_etag("fp", "1", {"x": 1, "y": [1.5, None]})
+    b = make_etag("fp", "1", {"y": [1.5, None], "x": 1})
+    assert a == b
+    assert a.startswith('"') and a.endswith('"')
+    assert make_etag("fp", "2", {"x": 1, "y": [1.5, None]}) != a
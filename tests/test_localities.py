@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+
+from aquaearth.inference import LOCALITY_FEATURES
+from aquaearth.localities import COLUMNS, LOCALITY_TABLE_PATH, LocalityTable
+
+HEADER = ",".join(COLUMNS)
+
+
+def write_table(tmp_path, *rows, version="7", header=HEADER):
+    path = tmp_path / "localities.csv"
+    lines = ["# A test table", f"# version: {version}" if version else "# no version", header, *rows]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_shipped_table():
+    table = LocalityTable.load()
+    assert table.path == LOCALITY_TABLE_PATH
+    assert len(table) == len(set(table.names)) > 0
+    assert table.features.shape == (len(table), len(LOCALITY_FEATURES))
+    for name in table:
+        i = table.ids[name]
+        assert table.names[i] == name
+        assert table.coords(i) == (table.lat[i], table.lon[i])
+    assert table.stats() == {"version": table.version, "path": LOCALITY_TABLE_PATH, "localities": len(table)}
+
+
+def test_load(tmp_path):
+    table = LocalityTable.load(write_table(tmp_path, "A,12.5,77.5,1,2,3", "", " B ,13,78,4,5,6"))
+    assert table.version == "7"
+    assert table.names == ["A", "B"]
+    assert "B" in table and "C" not in table
+    assert table.features.tolist() == [[1, 2, 3], [4, 5, 6]]
+    assert table.coords(1) == (13.0, 78.0)
+
+
+@pytest.mark.parametrize("rows, kwargs, message", [
+    (["A,12.5,77.5,1,2,3"], {"version": None}, "no '# version:' line"),
+    (["A,12.5,77.5,1,2,3"], {"header": "name,lat,lon"}, "expected columns"),
+    (["A,12.5,77.5,1,2"], {}, "row 2 has 5 fields"),
+    (["A,12.5,77.5,1,2,3", "B,north,77.5,1,2,3"], {}, "row 3 has a non-numeric value"),
+    (["A,12.5,77.5,1,2,3", "A,13,78,1,2,3"], {}, "Duplicate localities: A"),
+    ([",12.5,77.5,1,2,3"], {}, "empty name"),
+    (["A,95,77.5,1,2,3"], {}, "Invalid coordinates for A"),
+    (["A,12.5,77.5,1,nan,3"], {}, "Non-finite"),
+])
+def test_malformed_tables(tmp_path, rows, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        LocalityTable.load(write_table(tmp_path, *rows, **kwargs))
+
+
+def test_category_ids(caplog):
+    table = LocalityTable.from_rows([("A", 12, 77, 1, 2, 3), ("B", 13, 78, 1, 2, 3), ("C", 14, 79, 1, 2, 3)])
+    with caplog.at_level(logging.WARNING, logger="aquaearth.localities"):
+        assert table.category_ids(["C", "A", "D"]).tolist() == [1, -1, 0]
+    messages = [r.getMessage() for r in caplog.records]
+    assert messages == ["1 of 3 localities have no model category, e.g. B",
+                        "1 model categories are not in locality table None"]
+    with pytest.raises(ValueError, match="None of the 3 localities"):
+        table.category_ids(["X", "Y"])
+
+
+def test_model_reports_the_table(client, server):
+    assert client.get("/model").json()["localities"] == server.LOCALITIES.stats()
@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from aquaearth.microbatch import MicroBatcher
+
+
+class FakeEngine:
+    """Scores a row as its own values, recording every model call."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return X * 2
+
+
+def rows(i, n=1):
+    return np.full((n, 3), float(i), dtype=np.float32)
+
+
+def run(batcher, engine, inputs):
+    async def main():
+        return await asyncio.gather(*(batcher.predict_proba(engine, X) for X in inputs), return_exceptions=True)
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_call():
+    engine = FakeEngine()
+    inputs = [rows(i, n=1 + i % 3) for i in range(10)]
+    results = run(MicroBatcher(window_ms=0, max_rows=256), engine, inputs)
+    assert engine.calls == [sum(len(X) for X in inputs)]
+    for X, proba in zip(inputs, results):
+        np.testing.assert_array_equal(proba, X * 2)
+
+
+def test_timer_window_coalesces():
+    engine = FakeEngine()
+    batcher = MicroBatcher(window_ms=20, max_rows=256)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.predict_proba(engine, rows(1)))
+        await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(batcher.predict_proba(engine, rows(2)))
+        return await first, await second
+
+    first, second = asyncio.run(main())
+    assert engine.calls == [2]
+    np.testing.assert_array_equal(first, rows(1) * 2)
+    np.testing.assert_array_equal(second, rows(2) * 2)
+
+
+def test_full_batches_are_flushed():
+    engine = FakeEngine()
+    inputs = [rows(i, n=3) for i in range(5)]
+    results = run(MicroBatcher(window_ms=0, max_rows=6), engine, inputs)
+    assert engine.calls == [6, 6, 3]
+    for X, proba in zip(inputs, results):
+        np.testing.assert_array_equal(proba, X * 2)
+
+
+def test_large_and_disabled_calls_bypass_the_batch():
+    engine = FakeEngine()
+    run(MicroBatcher(window_ms=0, max_rows=4), engine, [rows(0, n=4), rows(1, n=5)])
+    assert engine.calls == [4, 5]
+    engine = FakeEngine()
+    run(MicroBatcher(window_ms=0, enabled=False), engine, [rows(0), rows(1)])
+    assert engine.calls == [1, 1]
+
+
+def test_batches_are_kept_per_engine():
+    old, new = FakeEngine(), FakeEngine()
+    batcher = MicroBatcher(window_ms=0)
+
+    async def main():
+        return await asyncio.gather(batcher.predict_proba(old, rows(1)), batcher.predict_proba(new, rows(2)),
+                                    batcher.predict_proba(old, rows(3)))
+
+    asyncio.run(main())
+    assert old.calls == [2] and new.calls == [1]
+
+
+def test_failure_reaches_every_request():
+    engine = FakeEngine(fail=True)
+    results = run(MicroBatcher(window_ms=0), engine, [rows(i) for i in range(4)])
+    assert engine.calls == [4]
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_stats():
+    batcher = MicroBatcher(window_ms=0)
+    run(batcher, FakeEngine(), [rows(i) for i in range(4)])
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["mean_rows_per_batch"] == pytest.approx(4)
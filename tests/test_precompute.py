@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aquaearth.localities import LocalityTable
+from aquaearth.precompute import ForecastFeatureBlocks
+from conftest import FakeOpenMeteo
+
+TABLE = LocalityTable.load()
+
+
+def breaking(index):
+    """An Open-Meteo reply whose series for one locality misses a day."""
+    def respond(request):
+        bodies = FakeOpenMeteo.open_meteo(request).json()
+        daily = bodies[index]["daily"]
+        for values in daily.values():
+            del values[3]
+        return httpx.Response(200, json=bodies)
+    return respond
+
+
+def test_refresh_fetches_every_locality_at_once(open_meteo):
+    blocks = ForecastFeatureBlocks(TABLE)
+    block, age, stale = asyncio.run(blocks.get(TABLE.names[0]))
+    assert len(open_meteo.requests) == 1
+    assert set(blocks.blocks) == set(TABLE.names)
+    assert block is blocks.blocks[TABLE.names[0]]
+    assert age < 1 and not stale
+
+
+def test_old_block_is_served_while_it_revalidates(open_meteo):
+    blocks = ForecastFeatureBlocks(TABLE, interval=60, stale_after=120)
+    name = TABLE.names[0]
+
+    async def main():
+        await blocks.refresh()
+        old = blocks.blocks[name]
+        old.fetched_at -= 90
+        block, age, stale = await blocks.get(name)
+        assert block is old and age >= 90 and not stale
+        # Let the background refresh start, then wait for it
+        await asyncio.sleep(0)
+        await blocks._refreshing
+        return old
+
+    old = asyncio.run(main())
+    assert len(open_meteo.requests) == 2
+    assert blocks.blocks[name] is not old
+    assert blocks.refreshes == 2
+
+
+def test_stale_blocks_are_flagged(open_meteo):
+    blocks = ForecastFeatureBlocks(TABLE, interval=60, stale_after=120)
+    name = TABLE.names[0]
+
+    async def main():
+        await blocks.refresh()
+        blocks.blocks[name].fetched_at -= 200
+        # The upstream is down: the old block is all there is
+        open_meteo.respond = lambda request: httpx.Response(500)
+        return await blocks.get(name)
+
+    _, age, stale = asyncio.run(main())
+    assert age >= 200 and stale
+
+
+def test_failed_locality_keeps_its_previous_block(open_meteo):
+    blocks = ForecastFeatureBlocks(TABLE)
+    broken, fine = TABLE.names[1], TABLE.names[2]
+
+    async def main():
+        await blocks.refresh()
+        before = dict(blocks.blocks)
+        open_meteo.respond = breaking(1)
+        await blocks.refresh()
+        return before
+
+    before = asyncio.run(main())
+    assert blocks.blocks[broken] is before[broken]
+    assert blocks.blocks[fine] is not before[fine]
+    assert list(blocks.errors) == [broken]
+    assert blocks.stats()["locality_errors"] == blocks.errors
+    assert blocks.failures == 0
+
+    open_meteo.respond = open_meteo.open_meteo
+    asyncio.run(blocks.refresh())
+    assert blocks.blocks[broken] is not before[broken]
+    assert blocks.errors == {}
+
+
+def test_locality_without_any_block_is_an_error(open_meteo):
+    open_meteo.respond = breaking(0)
+    blocks = ForecastFeatureBlocks(TABLE)
+    with pytest.raises(ValueError, match=f"No forecast weather for {TABLE.names[0]}"):
+        asyncio.run(blocks.get(TABLE.names[0]))
+    assert TABLE.names[1] in blocks.blocks
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from aquaearth.localities import LocalityTable
+from aquaearth.spatial import LocalityIndex, Locations, snap_to_grid
+
+
+def brute_force(index, lat, lon, k):
+    dist = np.hypot(index.x - lon * index._kx, index.y - lat * index._ky)
+    order = np.argsort(dist, kind="stable")[:k]
+    return dist[order]
+
+
+@pytest.mark.parametrize("n, k", [(1, 1), (21, 1), (21, 3), (500, 4), (10000, 8)])
+def test_nearest_matches_brute_force(n, k):
+    rng = np.random.default_rng(n)
+    lat = 12.97 + rng.normal(0, 0.1, n)
+    lon = 77.59 + rng.normal(0, 0.1, n)
+    index = LocalityIndex(lat, lon)
+    # Queries inside the points' area, at its edge and far outside it
+    queries = np.concatenate([
+        np.column_stack([12.97 + rng.normal(0, 0.15, 200), 77.59 + rng.normal(0, 0.15, 200)]),
+        [[lat.min(), lon.min()], [lat.max(), lon.max()], [28.6, 77.2], [-33.9, 151.2]],
+    ])
+    for qlat, qlon in queries:
+        idx, dist = index.nearest(qlat, qlon, k)
+        assert len(idx) == min(k, n)
+        np.testing.assert_allclose(dist, brute_force(index, qlat, qlon, k))
+        np.testing.assert_allclose(dist, np.hypot(index.x[idx] - qlon * index._kx, index.y[idx] - qlat * index._ky))
+
+
+def test_duplicate_points():
+    index = LocalityIndex([12.9, 12.9, 12.9, 13.0], [77.6, 77.6, 77.6, 77.7])
+    idx, dist = index.nearest(12.9, 77.6, 3)
+    assert sorted(idx.tolist()) == [0, 1, 2]
+    assert np.allclose(dist, 0)
+
+
+def test_empty_index_is_an_error():
+    with pytest.raises(ValueError):
+        LocalityIndex([], [])
+
+
+def test_snap_to_grid():
+    assert snap_to_grid(12.9716, 77.5946, 0.1) == (13.0, 77.6)
+    assert snap_to_grid(12.9716, 77.5946, 0) == (12.9716, 77.5946)
+
+
+def test_named_localities_keep_their_coordinates():
+    table = LocalityTable.load()
+    locations = Locations(table)
+    name = table.names[0]
+    place = locations.resolve(name)
+    assert (place.lat, place.lon) == table.coords(0)
+    assert place.info is None
+
+
+def test_coordinates_are_snapped_to_the_weather_grid():
+    table = LocalityTable.load()
+    lat, lon = table.coords(0)
+    place = Locations(table).resolve(lat=lat + 0.0123, lon=lon - 0.0071)
+    assert (place.lat, place.lon) == snap_to_grid(lat + 0.0123, lon - 0.0071)
+    assert place.info["weather_cell"] == [place.lat, place.lon]
+    assert place.info["nearest_locality"] == place.locality
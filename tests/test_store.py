@@ -0,0 +1,82 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from aquaearth import weather
+from aquaearth.store import ARCHIVE_FINAL_DAYS, WeatherStore, open_store
+from aquaearth.upstream import UpstreamUnavailable
+from conftest import HOUSEHOLD, daily_series
+
+LAT, LON = 12.9698, 77.75
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = WeatherStore(str(tmp_path / "weather.sqlite"))
+    monkeypatch.setattr(weather, "weather_store", store)
+    return store
+
+
+def archive_requests(open_meteo):
+    return [r for r in open_meteo.requests if "archive" in r.url.host]
+
+
+def test_round_trip(store):
+    daily = daily_series(LAT, LON, date(2024, 1, 1), 10)
+    assert store.save(LAT, LON, daily) == 10
+    stored = store.load(LAT, LON, date(2024, 1, 3), date(2024, 1, 4))
+    assert list(stored) == [date(2024, 1, 3), date(2024, 1, 4)]
+    assert stored[date(2024, 1, 3)] == (daily["temperature_2m_mean"][2], daily["temperature_2m_max"][2],
+                                        daily["precipitation_sum"][2])
+    assert store.load(LAT + 0.1, LON, date(2024, 1, 1), date(2024, 1, 10)) == {}
+    assert store.stats()["days_stored"] == 10
+
+
+def test_only_final_complete_days_are_stored(store):
+    last_final = date.today() - timedelta(days=ARCHIVE_FINAL_DAYS)
+    daily = daily_series(LAT, LON, last_final - timedelta(days=4), 8)
+    daily["precipitation_sum"][0] = None
+    # Day 0 is incomplete, days 5-7 are too recent to be final
+    assert store.save(LAT, LON, daily) == 4
+
+
+def test_open_store(tmp_path):
+    assert open_store("") is None
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    assert open_store(str(blocker / "weather.sqlite")) is None
+    assert isinstance(open_store(str(tmp_path / "weather.sqlite")), WeatherStore)
+
+
+def test_archive_days_are_fetched_once(store, open_meteo):
+    start, end = date(2024, 3, 1), date(2024, 3, 30)
+    first = asyncio.run(weather.fetch_archive_daily(LAT, LON, start, end))
+    assert len(archive_requests(open_meteo)) == 1
+    weather.weather_cache.clear()
+    assert asyncio.run(weather.fetch_archive_daily(LAT, LON, start, end)) == first
+    assert len(archive_requests(open_meteo)) == 1
+
+    # A later window only asks for the days the store does not have
+    asyncio.run(weather.fetch_archive_daily(LAT, LON, date(2024, 3, 20), date(2024, 4, 5)))
+    params = archive_requests(open_meteo)[-1].url.params
+    assert (params["start_date"], params["end_date"]) == ("2024-03-31", "2024-04-05")
+
+
+def test_offline_mode_serves_only_the_store(store, open_meteo, monkeypatch):
+    start, end = date(2024, 5, 1), date(2024, 5, 30)
+    stored = asyncio.run(weather.fetch_archive_daily(LAT, LON, start, end))
+    monkeypatch.setattr(weather, "WEATHER_OFFLINE", True)
+    weather.weather_cache.clear()
+    n_requests = len(open_meteo.requests)
+    assert asyncio.run(weather.fetch_archive_daily(LAT, LON, start, end)) == stored
+    with pytest.raises(UpstreamUnavailable, match="Offline mode: 1 of 31 days"):
+        asyncio.run(weather.fetch_archive_daily(LAT, LON, start, date(2024, 5, 31)))
+    assert len(open_meteo.requests) == n_requests
+
+
+def test_offline_miss_is_a_503(store, client, monkeypatch):
+    monkeypatch.setattr(weather, "WEATHER_OFFLINE", True)
+    response = client.post("/predict_week", json=dict(HOUSEHOLD, locality="Whitefield", prediction_date="2024-06-10"))
+    assert response.status_code == 503
+    assert response.json() == {"error": "Weather service unavailable"}
@@ -0,0 +1,75 @@
+import tracemalloc
+
+import pytest
+
+from aquaearth import sweep
+from aquaearth.sweep import expand_sweep
+
+from conftest import HOUSEHOLD
+
+
+def test_grid_is_the_cartesian_product():
+    grid = expand_sweep({"household_size": [1, 2, 3], "avg_supply_hours": {"start": 0, "stop": 1, "num": 2}})
+    assert grid["household_size"].tolist() == [1, 1, 2, 2, 3, 3]
+    assert grid["avg_supply_hours"].tolist() == [0, 1, 0, 1, 0, 1]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({}, "Nothing to sweep"),
+    ({"rainfall_30d_mm": [1]}, "Cannot sweep"),
+    ({"household_size": []}, "no values"),
+    ({"household_size": {"start": 1, "stop": 2, "num": 0}}, "num must be at least 1"),
+])
+def test_invalid_sweeps(spec, message):
+    with pytest.raises(ValueError, match=message):
+        expand_sweep(spec)
+
+
+def test_point_limits(monkeypatch):
+    monkeypatch.setattr(sweep, "SWEEP_MAX_POINTS", 100)
+    monkeypatch.setattr(sweep, "SWEEP_MAX_CONTRIB_POINTS", 10)
+    assert len(expand_sweep({"household_size": list(range(10)), "avg_supply_hours": list(range(10))})["household_size"]) == 100
+    with pytest.raises(ValueError, match="101 points"):
+        expand_sweep({"household_size": list(range(101))})
+    with pytest.raises(ValueError, match="with contributions: 11 points"):
+        expand_sweep({"household_size": list(range(11))}, contributions=True)
+
+
+@pytest.mark.parametrize("spec", [
+    {"household_size": {"start": 1, "stop": 9, "num": 300_000_000}},
+    # Each axis is small; their product is not
+    {field: {"start": 0, "stop": 1, "num": 1000} for field in
+     ("household_size", "usage_per_person_lpd", "avg_demand_liters", "avg_supply_liters")},
+])
+def test_huge_grid_is_rejected_before_allocating(spec):
+    tracemalloc.start()
+    try:
+        with pytest.raises(ValueError, match="Sweep too large"):
+            expand_sweep(spec)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 1 << 20
+
+
+def test_sweep_endpoint_matches_predict_week(client):
+    base = dict(HOUSEHOLD, locality="Whitefield", prediction_date="2025-03-01")
+    body = client.post("/scenario_sweep", json={
+        "base": base,
+        "sweep": {"household_size": [2, 5], "avg_supply_hours": {"start": 1, "stop": 4, "num": 4}},
+    }).json()
+    assert body["points"] == 8
+    for i in (0, 5):
+        point = dict(base, household_size=body["grid"]["household_size"][i],
+                     avg_supply_hours=body["grid"]["avg_supply_hours"][i])
+        single = client.post("/predict_week", json=point).json()
+        assert single["week_prediction"] == body["week_prediction"][i]
+        assert single["probabilities"] == {k: v[i] for k, v in body["probabilities"].items()}
+
+
+def test_sweep_endpoint_rejects_huge_num(client):
+    body = client.post("/scenario_sweep", json={
+        "base": dict(HOUSEHOLD, locality="Whitefield", prediction_date="2025-03-01"),
+        "sweep": {"household_size": {"start": 1, "stop": 9, "num": 300_000_000}},
+    }).json()
+    assert body == {"error": f"Sweep too large: 300000000 points (max {sweep.SWEEP_MAX_POINTS})"}
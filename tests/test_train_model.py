@@ -0,0 +1,38 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+
+spec = importlib.util.spec_from_file_location("train_model", os.path.join(ROOT, "backend", "train_model.py"))
+train_model = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(train_model)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 1000
+    df = pd.DataFrame({col: rng.integers(0, 50, n) for col in train_model.DTYPES})
+    df.insert(0, train_model.DATE_COLUMN, [f"{1 + i % 28:02d}-{1 + i % 12:02d}-2024" for i in range(n)])
+    # Localities and labels that only appear in later chunks
+    df["locality"] = [f"L{min(i // 100, 7)}" for i in range(n)]
+    df[train_model.TARGET] = np.where(np.arange(n) < 900, "Low", rng.choice(["High", "Medium"], n))
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_chunks_are_read_into_one_compact_frame(dataset):
+    whole = pd.read_csv(dataset, usecols=train_model.COLUMNS, dtype=train_model.DTYPES)
+    expected = train_model._add_date_features(whole)
+    got = train_model.load_dataset(dataset, chunksize=64)
+    assert list(got.columns) == list(expected.columns)
+    for col in ("locality", train_model.TARGET):
+        assert list(got[col].cat.categories) == sorted(expected[col].unique())
+        assert got[col].astype(str).tolist() == expected[col].astype(str).tolist()
+    numeric = [col for col in expected if not isinstance(expected[col].dtype, pd.CategoricalDtype)]
+    pd.testing.assert_frame_equal(got[numeric], expected[numeric])
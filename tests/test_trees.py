@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from aquaearth.trees import TreeEnsemble
+
+xgb = pytest.importorskip("xgboost")
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api", "models")
+# Leaf values are summed in a different order than xgboost does, so
+# probabilities agree to float32 rounding, not bit for bit
+TOLERANCE = 7e-7
+
+
+@pytest.fixture(scope="module")
+def booster():
+    booster = xgb.Booster()
+    booster.load_model(os.path.join(MODEL_DIR, "model.ubj"))
+    return booster
+
+
+def split_rows(ensemble, n, seed=0, missing=0.1):
+    """Rows whose values sit on, just below and just above the model's split
+    thresholds, so every branch and the ``x < threshold`` boundary is taken;
+    ``missing`` of the cells are NaN to exercise the default directions."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 100, (n, ensemble.num_features())).astype(np.float32)
+    for f in range(ensemble.num_features()):
+        thresholds = ensemble.split_threshold[ensemble.split_feature == f]
+        if thresholds.size:
+            picked = rng.choice(thresholds, n)
+            X[:, f] = picked + rng.choice([-1, 0, 1], n) * np.spacing(picked)
+    X[rng.random(X.shape) < missing] = np.nan
+    return X
+
+
+def test_npz_matches_booster(booster):
+    ensemble = TreeEnsemble.load(os.path.join(MODEL_DIR, "model_trees.npz"))
+    X = split_rows(ensemble, 5000)
+    expected = booster.inplace_predict(X)
+    got = ensemble.inplace_predict(X)
+    assert got.shape == expected.shape
+    assert got.dtype == np.float32
+    np.testing.assert_allclose(got, expected, rtol=0, atol=TOLERANCE)
+    assert (got.argmax(axis=1) == expected.argmax(axis=1)).mean() > 0.999
+
+
+def test_export_matches_booster(booster):
+    ensemble = TreeEnsemble.from_booster(booster)
+    X = split_rows(ensemble, 5000, seed=1, missing=0.3)
+    np.testing.assert_allclose(ensemble.inplace_predict(X), booster.inplace_predict(X), rtol=0, atol=TOLERANCE)
+
+
+def test_chunking_does_not_change_rows(booster):
+    ensemble = TreeEnsemble.from_booster(booster)
+    X = split_rows(ensemble, 200, seed=2)
+    whole = ensemble.inplace_predict(X)
+    one_by_one = np.concatenate([ensemble.inplace_predict(X[i:i + 1]) for i in range(len(X))])
+    np.testing.assert_array_equal(whole, one_by_one)
+
+
+def test_rejects_wrong_width(booster):
+    ensemble = TreeEnsemble.from_booster(booster)
+    with pytest.raises(ValueError):
+        ensemble.inplace_predict(np.zeros((3, ensemble.num_features() + 1), dtype=np.float32))
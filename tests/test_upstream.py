@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aquaearth import upstream
+from aquaearth.upstream import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(upstream.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 29.9
+    assert not breaker.allow()
+    clock[0] += 0.1
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    # One failed trial is enough, whatever the threshold
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock[0] += 30
+    assert breaker.allow()
+
+
+
+def breaking_client(retries=0):
+    client = upstream.UpstreamClient(retries=retries)
+    # Opens on the first failure and goes half-open immediately
+    client.breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+    return client
+
+
+def scripted(*replies):
+    """Replies in order, then a healthy JSON body."""
+    replies = iter(replies)
+    return lambda request: next(replies, None) or httpx.Response(200, json={"ok": True})
+
+
+def test_non_json_reply_during_trial_keeps_breaker_usable(open_meteo):
+    open_meteo.respond = scripted(httpx.Response(503, text="down"),
+                                  httpx.Response(200, text="<html>gateway error</html>"))
+    client = breaking_client()
+
+    async def main():
+        with pytest.raises(upstream.UpstreamUnavailable, match="503"):
+            await client.get_json("https://api.example/forecast", {})
+        # The half-open trial gets a 200 that is not JSON: a failed attempt, not a 500
+        with pytest.raises(upstream.UpstreamUnavailable, match="JSONDecodeError"):
+            await client.get_json("https://api.example/forecast", {})
+        return [await client.get_json("https://api.example/forecast", {}) for _ in range(3)]
+
+    assert asyncio.run(main()) == [{"ok": True}] * 3
+    assert client.breaker.state == "closed"
+
+
+def test_non_json_reply_is_retried(open_meteo, monkeypatch):
+    monkeypatch.setattr(upstream.random, "uniform", lambda a, b: 0.0)
+    open_meteo.respond = scripted(httpx.Response(200, text='{"daily": {"ti'))
+    client = upstream.UpstreamClient(retries=2)
+    assert asyncio.run(client.get_json("https://api.example/forecast", {})) == {"ok": True}
+    assert client.retried == 1 and len(open_meteo.requests) == 2
+
+
+def test_cancelled_trial_frees_the_slot(open_meteo):
+    client = breaking_client()
+    client.breaker.record_failure()
+    assert client.breaker.state == "half-open"
+
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await release.wait()
+            return httpx.Response(200, json={"ok": True})
+
+        open_meteo.respond = hang
+        trial = asyncio.ensure_future(client.get_json("https://api.example/forecast", {}))
+        await started.wait()
+        # While the trial is in flight nobody else gets through
+        with pytest.raises(upstream.UpstreamUnavailable, match="breaker is open"):
+            await client.get_json("https://api.example/forecast", {})
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        open_meteo.respond = scripted()
+        return await client.get_json("https://api.example/forecast", {})
+
+    assert asyncio.run(main()) == {"ok": True}
+    assert client.breaker.state == "closed"
+
+
+def test_client_of_a_previous_loop_is_closed(open_meteo):
+    client = upstream.UpstreamClient()
+
+    async def fetch():
+        await client.get_json("https://api.example/forecast", {"latitude": "12.9", "longitude": "77.6"})
+        return client._client
+
+    first = asyncio.run(fetch())
+    second = asyncio.run(fetch())
+    assert second is not first
+    assert first.is_closed and not second.is_closed